@@ -9,41 +9,52 @@ Backtrader script for EMA/RSI/MACD strategy on XAUUSD 5m data.
 - Handles ZeroDivisionError for indicators
 - Logs to /backtest/backtest_strategy.txt
 - Saves plot to /backtest/strategy_plot.png
+- Optionally cross-checks the final value against the vectorized engine (scripts/vector_backtest.py)
+- Records portfolio value per bar and closed-trade PnL, and reports Sharpe, Sortino, drawdown, win rate,
+  profit factor and exposure (scripts/performance.py) after the run
+- Signals, fills and closed trades go to a buffered event recorder (scripts/trade_recorder.py), flushed in
+  bulk to backtest/strategy_events.parquet (.npy without pyarrow); per-trade text lines are optional
+  (LOG_TRADES) and written through a QueueHandler
 """
 
 import os
 import logging
-import pandas as pd
+from contextlib import ExitStack
+
 import backtrader as bt
-import matplotlib.pyplot as plt
+import numpy as np
+
+from bar_store import load_bars
+from performance import performance_report, session_returns
+from trade_recorder import TradeRecorder, queue_logging
+from instrument import stage, timed, run_summary
+from vector_backtest import STRATEGY_PARAMS, run_backtest
 
 # === Configurations ===
 DATA_PATH = "dataset/xauusd_5m.csv"
 BACKTEST_DIR = "backtest"
 os.makedirs(BACKTEST_DIR, exist_ok=True)
 LOG_FILE = os.path.join(BACKTEST_DIR, "backtest_strategy.txt")
+PLOT_PATH = os.path.join(BACKTEST_DIR, "strategy_plot.png")
+VERIFY_VECTOR_ENGINE = True  # compare Backtrader's final value with the vectorized engine
+VERIFY_TOLERANCE = 1e-6      # relative tolerance on final portfolio value
+EVENTS_BASE = os.path.join(BACKTEST_DIR, "strategy_events")  # + .parquet or .npy
+LOG_TRADES = False           # also write one text line per event (via QueueHandler)
+TRADE_LOG_FILE = os.path.join(BACKTEST_DIR, "strategy_trades.txt")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [INFO] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, mode="w")
-    ]
-)
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
 
 # === Strategy ===
 class EMA_RSI_MACD(bt.Strategy):
-    params = dict(
-        ema_fast=8,
-        ema_slow=13,
-        rsi_period=14,
-        rsi_overbought=70,
-        rsi_oversold=30,
-        macd_fast=12,
-        macd_slow=26,
-        macd_signal=9
-    )
+    params = dict(STRATEGY_PARAMS, recorder=None)
 
     def __init__(self):
         self.ema_fast = bt.ind.EMA(self.data.close, period=self.p.ema_fast)
@@ -56,8 +67,35 @@ class EMA_RSI_MACD(bt.Strategy):
             period_signal=self.p.macd_signal
         )
         self.cross = bt.ind.CrossOver(self.ema_fast, self.ema_slow)
+        self.equity_log = []
+        self.position_log = []
+        self.trade_pnl = []
+
+    def record(self):
+        self.equity_log.append(self.broker.getvalue())
+        self.position_log.append(self.position.size)
+
+    def now(self):
+        return np.datetime64(self.data.datetime.datetime(0), "ns")
+
+    def notify_order(self, order):
+        if order.status == order.Completed and self.p.recorder is not None:
+            self.p.recorder.record(self.now(), "fill", 1 if order.isbuy() else -1, order.executed.price,
+                                   abs(order.executed.size), order.executed.comm)
 
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.trade_pnl.append(trade.pnlcomm)
+            if self.p.recorder is not None:
+                self.p.recorder.record(self.now(), "close", 1 if trade.long else -1, trade.price,
+                                       0.0, trade.commission, trade.pnlcomm)
+
+    def prenext(self):
+        self.record()
+
+    @timed("strategy.next")
     def next(self):
+        self.record()
         # skip until indicators are ready
         if len(self.data) < max(self.p.ema_slow, self.p.rsi_period, self.p.macd_slow):
             return
@@ -65,50 +103,81 @@ class EMA_RSI_MACD(bt.Strategy):
         if not self.position:
             if self.cross > 0 and self.rsi < self.p.rsi_overbought and self.macd.macd > self.macd.signal:
                 self.buy()
-                logging.info(f"BUY at {self.data.datetime.datetime(0)} price {self.data.close[0]:.2f}")
+                if self.p.recorder is not None:
+                    self.p.recorder.record(self.now(), "signal", 1, self.data.close[0], 1.0)
             elif self.cross < 0 and self.rsi > self.p.rsi_oversold and self.macd.macd < self.macd.signal:
                 self.sell()
-                logging.info(f"SELL at {self.data.datetime.datetime(0)} price {self.data.close[0]:.2f}")
+                if self.p.recorder is not None:
+                    self.p.recorder.record(self.now(), "signal", -1, self.data.close[0], 1.0)
         else:
             if self.position.size > 0 and self.cross < 0:
                 self.close()
             elif self.position.size < 0 and self.cross > 0:
                 self.close()
 
+@timed("backtest")
+def run_strategy(df, recorder=None):
+    """Run EMA_RSI_MACD over an OHLCV DataFrame with the 100k cash / 0.05% commission broker. Returns (cerebro, strategy)."""
+    data = bt.feeds.PandasData(dataname=df, timeframe=bt.TimeFrame.Minutes, compression=5)
+    cerebro = bt.Cerebro()
+    cerebro.adddata(data)
+    cerebro.broker.setcash(100000)
+    cerebro.broker.setcommission(commission=0.0005)  # 0.05%
+    cerebro.addstrategy(EMA_RSI_MACD, recorder=recorder)
+    return cerebro, cerebro.run()[0]
+
+
 # === Main ===
-if __name__ == "__main__":
-    logging.info("Loading CSV data from %s", DATA_PATH)
-    if not os.path.exists(DATA_PATH):
-        logging.error("CSV file not found: %s", DATA_PATH)
+def main(data_path=DATA_PATH, plot_path=None):
+    """Run the Backtrader backtest; save the candle plot only if plot_path is given. Returns the final value."""
+    logging.info("Loading CSV data from %s", data_path)
+    if not os.path.exists(data_path):
+        logging.error("CSV file not found: %s", data_path)
         exit(1)
 
-    df = pd.read_csv(DATA_PATH)
-    if len(df) < 26:
+    with stage("load"):
+        df_bt = load_bars(data_path)
+    if len(df_bt) < 26:
         logging.error("Not enough data for EMA/MACD/RSI calculation")
         exit(1)
 
-    # Prepare Backtrader feed
-    df_bt = df.copy()
-    df_bt["datetime"] = pd.to_datetime(df_bt["Date"] + " " + df_bt["Time"], format="%Y.%m.%d %H:%M")
-    df_bt.set_index("datetime", inplace=True)
-    df_bt = df_bt[["Open","High","Low","Close","Volume"]]
-
-    data = bt.feeds.PandasData(dataname=df_bt, timeframe=bt.TimeFrame.Minutes, compression=5)
-
-    # Cerebro engine
-    cerebro = bt.Cerebro()
-    cerebro.addstrategy(EMA_RSI_MACD)
-    cerebro.adddata(data)
-    cerebro.broker.setcash(100000)
-    cerebro.broker.setcommission(commission=0.0005)  # 0.05%
-
     logging.info("Starting backtest...")
-    cerebro.run()
+    with ExitStack() as stack:
+        trade_logger = stack.enter_context(queue_logging(TRADE_LOG_FILE)) if LOG_TRADES else None
+        recorder = stack.enter_context(TradeRecorder(EVENTS_BASE, text_logger=trade_logger))
+        cerebro, strat = run_strategy(df_bt, recorder)
     logging.info("Backtest completed. Final Portfolio Value: %.2f", cerebro.broker.getvalue())
+    logging.info("%d trade events saved to %s", recorder.total, recorder.path)
+    equity = np.asarray(strat.equity_log)
+    with stage("report"):
+        stats = performance_report(equity, strat.position_log, strat.trade_pnl)
+    logging.info("Performance: %s", ", ".join(f"{k}={v:.4g}" for k, v in stats.items()))
+    logging.info("Sessions:\n%s", session_returns(equity, df_bt.index[-len(equity):]).to_string())
+
+    if VERIFY_VECTOR_ENGINE:
+        with stage("verify"):
+            vec_value = run_backtest(df_bt, cash=100000, commission=0.0005).final_value
+        bt_value = cerebro.broker.getvalue()
+        if abs(vec_value - bt_value) <= VERIFY_TOLERANCE * abs(bt_value):
+            logging.info("Vectorized engine matches Backtrader (%.2f)", vec_value)
+        else:
+            logging.warning("Vectorized engine final value %.2f differs from Backtrader %.2f", vec_value, bt_value)
 
     # Plot and save figure
-    logging.info("Saving plot to backtest folder")
-    plt_path = os.path.join(BACKTEST_DIR, "strategy_plot.png")
-    fig = cerebro.plot(style='candle')[0][0]
-    fig.savefig(plt_path)
-    logging.info("Plot saved at %s", plt_path)
+    if plot_path:
+        logging.info("Saving plot to %s", plot_path)
+        with stage("plot"):
+            import matplotlib
+            backend = matplotlib.get_backend()  # MPLBACKEND, else auto (Agg when headless)
+            import backtrader.plot  # noqa: F401  forces TkAgg on import
+            matplotlib.use(backend)
+            fig = cerebro.plot(style='candle')[0][0]
+            fig.savefig(plot_path)
+        logging.info("Plot saved at %s", plot_path)
+    return cerebro.broker.getvalue()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("backtest_strategy"):
+        main(plot_path=PLOT_PATH)
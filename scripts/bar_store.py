@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+scripts/bar_store.py
+
+Shared columnar bar store for XAUUSD OHLCV CSV files.
+- Parses a Date,Time,Open,High,Low,Close,Volume CSV once.
+- Caches int64 epoch timestamps (seconds) and float64 OHLCV columns as .npy files under dataset/cache/.
+- Reopens the cache memory-mapped, so later runs skip text parsing entirely.
+- Rebuilds the cache automatically when the source CSV changes (size or mtime).
+- Serves "last N bars" and [start, end) datetime windows by binary search on the timestamp column,
+  decoding only the rows in the window.
+- Reads partitioned sources (dataset/xauusd_1m/*.csv, headerless monthly files) as one stream and
+  resamples 1m bars to 5m/15m/30m/1h in a single chunked pass (first/max/min/last/sum).
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+# === Configurations ===
+CACHE_ROOT = os.path.join("dataset", "cache")
+CACHE_VERSION = 1
+META_FILE = "meta.json"
+TIMESTAMP_COLUMN = "timestamp"
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+CSV_COLUMNS = ("Date", "Time") + PRICE_COLUMNS
+DATE_FORMAT = "%Y.%m.%d"
+PARTITION_DIR = os.path.join("dataset", "xauusd_1m")
+TIMEFRAMES = (5, 15, 30, 60)   # minutes produced from the 1m partitions in one pass
+DEFAULT_TIMEFRAME = 5          # timeframe served for partitioned sources when none is given
+CHUNK_ROWS = 200_000           # 1m rows parsed per chunk when streaming partitions
+
+
+# === Parsing ===
+def _parse_times(time_values) -> np.ndarray:
+    """Convert HH:MM strings to seconds since midnight (int64)."""
+    codes, uniques = pd.factorize(time_values)
+    parts = pd.Series(uniques).str.split(":", expand=True).astype(np.int64)
+    seconds = parts[0].to_numpy() * 3600 + parts[1].to_numpy() * 60
+    return seconds[codes]
+
+
+def _parse_dates(date_values) -> np.ndarray:
+    """Convert YYYY.MM.DD strings to epoch seconds at midnight (int64)."""
+    codes, uniques = pd.factorize(date_values)
+    days = pd.to_datetime(pd.Series(uniques), format=DATE_FORMAT).to_numpy().astype("datetime64[s]")
+    return days.astype(np.int64)[codes]
+
+
+def has_header(path: str) -> bool:
+    """True if the first line of the CSV is a header row (the 1m partitions have none)."""
+    with open(path) as f:
+        first = f.readline().strip()
+    return not first[:1].isdigit()
+
+
+def _read_csv(path: str, header=None, chunksize=None):
+    """pd.read_csv with the bar column names and dtypes; header=None auto-detects the header row."""
+    if header is None:
+        header = has_header(path)
+    return pd.read_csv(
+        path,
+        header=0 if header else None,
+        names=list(CSV_COLUMNS),
+        dtype={"Date": str, "Time": str, **{c: np.float64 for c in PRICE_COLUMNS}},
+        chunksize=chunksize,
+    )
+
+
+def _frame_to_columns(df: pd.DataFrame) -> dict:
+    """Convert a parsed CSV frame into the timestamp + OHLCV column dict."""
+    columns = {TIMESTAMP_COLUMN: _parse_dates(df["Date"].to_numpy()) + _parse_times(df["Time"].to_numpy())}
+    for col in PRICE_COLUMNS:
+        columns[col] = df[col].to_numpy(dtype=np.float64)
+    return columns
+
+
+def parse_bar_csv(path: str, header=None) -> dict:
+    """
+    Parse an OHLCV CSV into columnar numpy arrays.
+    Dates and times are parsed once per unique value instead of once per row.
+    Returns dict with 'timestamp' (int64 epoch seconds) and float64 OHLCV columns.
+    """
+    return _frame_to_columns(_read_csv(path, header=header))
+
+
+# === Partitioned 1m sources ===
+def partition_files(directory: str) -> list:
+    """Monthly partition files in chronological order (names sort as xauusd_1m_YYYY_MM.csv)."""
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".csv")]
+
+
+def iter_partition_chunks(directory: str, chunksize: int = CHUNK_ROWS):
+    """Yield column dicts of at most `chunksize` rows, streaming the partitions in order."""
+    for path in partition_files(directory):
+        for df in _read_csv(path, chunksize=chunksize):
+            yield _frame_to_columns(df)
+
+
+def _concat_columns(parts: list) -> dict:
+    """Concatenate a list of column dicts column by column."""
+    if not parts:
+        return {name: np.empty(0, dtype=np.int64 if name == TIMESTAMP_COLUMN else np.float64)
+                for name in (TIMESTAMP_COLUMN,) + PRICE_COLUMNS}
+    return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+
+def aggregate_bars(columns: dict, minutes: int) -> dict:
+    """
+    Aggregate time-sorted bars into `minutes` buckets (labelled by bucket start):
+    Open=first, High=max, Low=min, Close=last, Volume=sum.
+    """
+    ts = columns[TIMESTAMP_COLUMN]
+    if len(ts) == 0:
+        return _concat_columns([])
+    bucket = ts - ts % (minutes * 60)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+    return {
+        TIMESTAMP_COLUMN: bucket[starts],
+        "Open": columns["Open"][starts],
+        "High": np.maximum.reduceat(columns["High"], starts),
+        "Low": np.minimum.reduceat(columns["Low"], starts),
+        "Close": columns["Close"][ends - 1],
+        "Volume": np.add.reduceat(columns["Volume"], starts),
+    }
+
+
+class StreamingResampler:
+    """
+    Resample a stream of 1m chunks into one timeframe.
+    Rows of the last (possibly unfinished) bucket are carried into the next chunk,
+    so buckets split across chunk or file boundaries aggregate correctly.
+    """
+
+    def __init__(self, minutes: int):
+        self.minutes = minutes
+        self.width = minutes * 60
+        self.pending = None
+        self.parts = []
+
+    def update(self, columns: dict) -> None:
+        if self.pending is not None:
+            columns = _concat_columns([self.pending, columns])
+        ts = columns[TIMESTAMP_COLUMN]
+        if len(ts) == 0:
+            return
+        last_bucket = ts[-1] - ts[-1] % self.width
+        split = int(np.searchsorted(ts, last_bucket, side="left"))
+        self.pending = {name: values[split:] for name, values in columns.items()}
+        if split > 0:
+            self.parts.append(aggregate_bars({name: values[:split] for name, values in columns.items()},
+                                             self.minutes))
+
+    def finish(self) -> dict:
+        if self.pending is not None:
+            self.parts.append(aggregate_bars(self.pending, self.minutes))
+            self.pending = None
+        return _concat_columns(self.parts)
+
+
+def resample_partitions(directory: str, timeframes=TIMEFRAMES, chunksize: int = CHUNK_ROWS) -> dict:
+    """
+    Stream the 1m partitions once and build every requested timeframe.
+    Only one chunk of 1m rows is held in memory at a time.
+    Returns {minutes: column dict}.
+    """
+    resamplers = [StreamingResampler(m) for m in timeframes]
+    for chunk in iter_partition_chunks(directory, chunksize):
+        for r in resamplers:
+            r.update(chunk)
+    return {r.minutes: r.finish() for r in resamplers}
+
+
+# === Cache management ===
+def source_fingerprint(path: str) -> dict:
+    """Identify a source file (or directory of files) by name, size and mtime."""
+    if os.path.isdir(path):
+        files = sorted(os.listdir(path))
+        return {"files": [[f] + list(source_fingerprint(os.path.join(path, f)).values()) for f in files]}
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cache_dir_for(path: str, cache_root: str = CACHE_ROOT, suffix: str = "") -> str:
+    """Cache directory for a source path, e.g. dataset/cache/xauusd_5m."""
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return os.path.join(cache_root, name + suffix)
+
+
+def read_meta(cache_dir: str):
+    """Return cache metadata dict, or None if the cache is missing or unreadable."""
+    try:
+        with open(os.path.join(cache_dir, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_columns(cache_dir: str, columns: dict, meta: dict) -> None:
+    """
+    Write columns as <name>.npy plus meta.json.
+    meta.json is removed first and written last, so a crash never leaves a cache that looks valid.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, values in columns.items():
+        tmp_path = os.path.join(cache_dir, f".{name}.tmp.npy")
+        np.save(tmp_path, np.ascontiguousarray(values))
+        os.replace(tmp_path, os.path.join(cache_dir, f"{name}.npy"))
+    meta = dict(meta, version=CACHE_VERSION, rows=int(len(columns[TIMESTAMP_COLUMN])),
+                columns=list(columns))
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def cache_is_fresh(meta, source: str) -> bool:
+    """True if cache metadata matches the current cache version and source fingerprint."""
+    return (meta is not None
+            and meta.get("version") == CACHE_VERSION
+            and meta.get("fingerprint") == source_fingerprint(source))
+
+
+def build_partition_caches(directory: str, timeframes, cache_root: str = CACHE_ROOT) -> None:
+    """Resample the partitions in one pass and write one cache per timeframe."""
+    logging.info("Resampling 1m partitions in %s to %s minute bars", directory, list(timeframes))
+    fingerprint = source_fingerprint(directory)
+    for minutes, columns in resample_partitions(directory, timeframes).items():
+        cache_dir = cache_dir_for(directory, cache_root, suffix=f"_{minutes}m")
+        write_columns(cache_dir, columns, {"source": directory, "timeframe": minutes, "fingerprint": fingerprint})
+        logging.info("Bar cache written to %s (%d rows)", cache_dir, len(columns[TIMESTAMP_COLUMN]))
+
+
+def build_cache(csv_path: str, cache_dir: str, header=None) -> None:
+    """Parse csv_path once and write the columnar cache."""
+    logging.info("Building bar cache for %s", csv_path)
+    columns = parse_bar_csv(csv_path, header=header)
+    write_columns(cache_dir, columns, {"source": csv_path, "fingerprint": source_fingerprint(csv_path)})
+    logging.info("Bar cache written to %s (%d rows)", cache_dir, len(columns[TIMESTAMP_COLUMN]))
+
+
+def to_epoch_seconds(value) -> int:
+    """Convert a datetime-like (str, datetime, pd.Timestamp, np.datetime64) to epoch seconds."""
+    return int(pd.Timestamp(value).to_datetime64().astype("datetime64[s]").astype(np.int64))
+
+
+# === Store ===
+class BarStore:
+    """Memory-mapped OHLCV columns with int64 epoch-second timestamps."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.meta = read_meta(cache_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"Bar cache not found: {cache_dir}")
+        self.columns = {
+            name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+            for name in self.meta["columns"]
+        }
+        self.timestamps = self.columns[TIMESTAMP_COLUMN]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def fingerprint(self) -> str:
+        """Short stable identifier of the cached data (source, timeframe, rows), for downstream caches."""
+        ident = json.dumps({k: self.meta.get(k) for k in ("source", "timeframe", "rows", "fingerprint")},
+                           sort_keys=True)
+        return hashlib.blake2b(ident.encode(), digest_size=16).hexdigest()
+
+    def index_range(self, start=None, end=None):
+        """Row indices [i0, i1) of bars with start <= timestamp < end (None means unbounded)."""
+        i0 = 0 if start is None else int(np.searchsorted(self.timestamps, to_epoch_seconds(start), side="left"))
+        i1 = len(self) if end is None else int(np.searchsorted(self.timestamps, to_epoch_seconds(end), side="left"))
+        return i0, max(i0, i1)
+
+    def tail(self, n: int) -> pd.DataFrame:
+        """The last n bars."""
+        return self.frame(max(len(self) - int(n), 0))
+
+    def between(self, start=None, end=None) -> pd.DataFrame:
+        """Bars with start <= datetime < end."""
+        return self.frame(*self.index_range(start, end))
+
+    def frame(self, start=0, stop=None) -> pd.DataFrame:
+        """Copy rows [start, stop) into a DataFrame indexed by datetime."""
+        ts = np.asarray(self.timestamps[start:stop])
+        index = pd.DatetimeIndex(ts.astype("datetime64[s]").astype("datetime64[ns]"), name="datetime")
+        return pd.DataFrame({c: np.array(self.columns[c][start:stop]) for c in PRICE_COLUMNS}, index=index)
+
+
+def open_bar_store(csv_path: str, cache_root: str = CACHE_ROOT, header=None, rebuild=False,
+                   timeframe=None) -> BarStore:
+    """
+    Open the memory-mapped cache for csv_path, building it on first use
+    or when the CSV has changed since the cache was written.
+    csv_path may also be a directory of 1m partitions; bars are then resampled to
+    `timeframe` minutes (default DEFAULT_TIMEFRAME), and all TIMEFRAMES are rebuilt together.
+    """
+    if os.path.isdir(csv_path):
+        timeframe = timeframe or DEFAULT_TIMEFRAME
+        cache_dir = cache_dir_for(csv_path, cache_root, suffix=f"_{timeframe}m")
+        if rebuild or not cache_is_fresh(read_meta(cache_dir), csv_path):
+            timeframes = sorted(set(TIMEFRAMES) | {timeframe})
+            build_partition_caches(csv_path, timeframes, cache_root)
+        return BarStore(cache_dir)
+
+    cache_dir = cache_dir_for(csv_path, cache_root)
+    if rebuild or not cache_is_fresh(read_meta(cache_dir), csv_path):
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+        build_cache(csv_path, cache_dir, header=header)
+    return BarStore(cache_dir)
+
+
+def load_bars(csv_path: str, tail=None, start=None, end=None, cache_root: str = CACHE_ROOT,
+              timeframe=None) -> pd.DataFrame:
+    """
+    Load bars of csv_path (a CSV file or a 1m partition directory) as an OHLCV DataFrame indexed by datetime.
+    - tail: keep only the last N bars (applied after the start/end window).
+    - start/end: keep bars with start <= datetime < end.
+    - timeframe: minutes to resample partitioned 1m sources to.
+    Only the selected rows are copied out of the memory-mapped cache.
+    """
+    store = open_bar_store(csv_path, cache_root, timeframe=timeframe)
+    i0, i1 = store.index_range(start, end)
+    if tail is not None:
+        i0 = max(i0, i1 - int(tail))
+    logging.info("Opened bar store %s with %d rows, using %d", store.cache_dir, len(store), i1 - i0)
+    return store.frame(i0, i1)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    for path in sys.argv[1:] or ["dataset/xauusd_5m.csv", PARTITION_DIR]:
+        store = open_bar_store(path, rebuild=True)
+        logging.info("%s: %d bars", path, len(store))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+scripts/batch_backtest.py
+
+Run the EMA_RSI_MACD strategy (vectorized engine) over many instruments and timeframes at once.
+- A target is "<source>@<minutes>" for bar files and the 1m partition directory
+  (e.g. dataset/xauusd_1m@15), or "daily:<CUR>" for a currency column of dataset/xauusd_daily.csv.
+- Targets run in parallel; workers memory-map the bar store caches, so all processes share one
+  copy of each series through the page cache.
+- Daily columns come from the daily_store.py cache (one memory-mapped block for all 19 currencies);
+  they are close-only: fills use the next bar's close instead of its open.
+- Starting cash scales with each instrument's price level (CASH_PER_PRICE x first close), so
+  results in JPY or IDR are comparable with USD.
+- Writes the long performance table to backtest/batch_backtest.csv and an instrument x timeframe
+  Sharpe matrix to backtest/batch_backtest_sharpe.csv; logs to logs/batch_backtest.txt.
+"""
+
+import os
+import logging
+import argparse
+import multiprocessing as mp
+
+import pandas as pd
+
+from bar_store import open_bar_store, PARTITION_DIR, TIMEFRAMES
+from daily_store import open_daily_store, CURRENCIES as DAILY_CURRENCIES, DAILY_PATH
+from vector_backtest import STRATEGY_PARAMS, run_backtest_arrays, summary_stats
+from instrument import stage, run_summary
+
+# === Configurations ===
+BACKTEST_DIR = "backtest"
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "batch_backtest.txt")
+RESULTS_OUT_CSV = os.path.join(BACKTEST_DIR, "batch_backtest.csv")
+MATRIX_OUT_CSV = os.path.join(BACKTEST_DIR, "batch_backtest_sharpe.csv")
+
+TARGETS = ([f"{PARTITION_DIR}@{m}" for m in TIMEFRAMES]
+           + [f"daily:{c}" for c in DAILY_CURRENCIES])
+DAILY_MINUTES = 1440
+CASH_PER_PRICE = 40.0       # starting cash in units of the first close (~100k for gold in USD)
+N_WORKERS = os.cpu_count()
+MATRIX_METRIC = "sharpe"
+
+
+def parse_target(target: str):
+    """(source, minutes) from "path@minutes" or "daily:CUR"."""
+    if target.startswith("daily:"):
+        return target, DAILY_MINUTES
+    source, _, minutes = target.rpartition("@")
+    if not source:
+        raise ValueError(f"target needs a timeframe, e.g. {target}@5")
+    return source, int(minutes)
+
+
+def instrument_name(source: str) -> str:
+    """Row label: XAU<CUR> for daily columns, the file stem before its timeframe suffix otherwise."""
+    if source.startswith("daily:"):
+        return "XAU" + source.split(":", 1)[1]
+    return os.path.basename(os.path.normpath(source)).split(".")[0].split("_")[0].upper()
+
+
+def bars_per_year(minutes: int) -> float:
+    """Bars per trading year: 252 days of ~23h sessions intraday, 252 bars for daily data."""
+    return 252.0 if minutes >= DAILY_MINUTES else 252 * 23 * 60 / minutes
+
+
+def load_daily_column(currency: str, path=DAILY_PATH) -> pd.Series:
+    """Close series of one currency column of the daily file, missing quotes dropped."""
+    return open_daily_store(path).column(currency)
+
+
+def load_target(source: str, minutes: int):
+    """(open, close) arrays for a target; daily columns use close for both (fills at next close)."""
+    if source.startswith("daily:"):
+        close = load_daily_column(source.split(":", 1)[1]).to_numpy()
+        return close, close
+    store = open_bar_store(source, timeframe=minutes if os.path.isdir(source) else None)
+    return store["Open"], store["Close"]
+
+
+def run_target(target: str, params=None) -> dict:
+    """Backtest one target; returns its row of the performance table."""
+    source, minutes = parse_target(target)
+    row = {"target": target, "instrument": instrument_name(source), "timeframe": minutes}
+    try:
+        open_, close = load_target(source, minutes)
+        cash = CASH_PER_PRICE * float(close[0])
+        result = run_backtest_arrays(open_, close, params, cash=cash)
+        stats = summary_stats(result, bars_per_year(minutes))
+        row.update(bars=len(close), cash=cash, **stats)
+    except Exception as e:
+        logging.warning("Target %s failed: %s", target, e)
+        row["error"] = str(e)
+    return row
+
+
+def run_batch(targets=TARGETS, params=None, n_workers=N_WORKERS) -> pd.DataFrame:
+    """Backtest all targets in parallel and return the performance table (one row per target)."""
+    params = dict(STRATEGY_PARAMS, **(params or {}))
+    for target in targets:  # build bar store caches once, before workers map them
+        source, minutes = parse_target(target)
+        if source.startswith("daily:"):
+            open_daily_store()
+        else:
+            open_bar_store(source, timeframe=minutes if os.path.isdir(source) else None)
+    logging.info("Batch backtest of %d targets on %d workers", len(targets), n_workers)
+    tasks = [(t, params) for t in targets]
+    if n_workers > 1:
+        with mp.Pool(min(n_workers, len(targets))) as pool:
+            rows = pool.starmap(run_target, tasks)
+    else:
+        rows = [run_target(*task) for task in tasks]
+    return pd.DataFrame(rows)
+
+
+def performance_matrix(results: pd.DataFrame, metric=MATRIX_METRIC) -> pd.DataFrame:
+    """Instrument x timeframe table of one metric."""
+    return results.pivot_table(index="instrument", columns="timeframe", values=metric)
+
+
+# === Main ===
+def setup_logging():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch EMA_RSI_MACD backtests over instruments and timeframes")
+    parser.add_argument("targets", nargs="*", default=list(TARGETS),
+                        help='"path@minutes" or "daily:CUR" (default: 1m partitions at all timeframes + all currencies)')
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    args = parser.parse_args(argv)
+
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    with stage("backtest"):
+        results = run_batch(args.targets, n_workers=args.workers)
+    with stage("save"):
+        results.to_csv(RESULTS_OUT_CSV, index=False)
+    logging.info("Performance table saved to %s", RESULTS_OUT_CSV)
+    matrix = performance_matrix(results)
+    matrix.to_csv(MATRIX_OUT_CSV)
+    logging.info("%s matrix saved to %s:\n%s", MATRIX_METRIC, MATRIX_OUT_CSV, matrix.round(3).to_string())
+    return results
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("batch_backtest"):
+        main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+scripts/benchmark.py
+
+Reproducible benchmarks of the load, preprocess, fit, forecast and backtest hot paths.
+- Runs on synthetic 5m OHLCV bars (GBM closes, seeded), written as a CSV in the dataset format,
+  so no real dataset is needed; size set by --bars.
+- Each case is set up untimed, run once under tracemalloc for peak traced memory (this run also
+  warms caches and compiled functions), then timed --repeat times with perf_counter. INFO logging
+  is disabled while a case runs.
+- Cases whose backend is not installed (e.g. TensorFlow) are recorded as skipped.
+- Results go to tmp/benchmark.json; with a baseline (tmp/benchmark_baseline.json, written by
+  --save-baseline) every case is compared and slowdowns beyond REGRESSION_TOLERANCE are flagged.
+- Logs to logs/benchmark.txt.
+
+Usage: python scripts/benchmark.py --bars 50000 [--cases monte_carlo_gbm backtest_vector] [--save-baseline]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# === Configurations ===
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "benchmark.txt")
+TMP_DIR = "tmp"
+RESULTS_JSON = os.path.join(TMP_DIR, "benchmark.json")
+BASELINE_JSON = os.path.join(TMP_DIR, "benchmark_baseline.json")
+
+N_BARS = 50_000
+SEED = 42
+REPEAT = 3
+REGRESSION_TOLERANCE = 0.25     # flag a case if median time or peak memory grows by more than 25%
+START_PRICE = 2600.0
+BAR_SIGMA = 0.0008              # per-bar log-return std of the synthetic closes
+
+MODEL_BARS = 2_000              # tail used by the ARIMA/GARCH cases
+ARIMA_GRID = ((0, 2), (0, 0), (0, 2))   # p, d, q ranges of the benchmarked grid search
+ARIMA_WORKERS = max(2, os.cpu_count() or 1)  # pool of the parallel grid case (start-up timed, peak_mb is the parent only)
+MC_STEPS = 50
+MC_PATHS = 10_000
+DL_BARS = 10_000                # tail windowed / scaled for the neural model cases
+DL_LOOKBACK = 50                # LOOKBACK of model_lstm_gru / model_transformer
+DL_SIMULATIONS = 100
+
+CASES = {}
+
+
+def case(name):
+    """Register a benchmark: the decorated function does the untimed setup and returns the callable to time."""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+# === Synthetic data ===
+def synthetic_bars(n: int = N_BARS, seed: int = SEED) -> pd.DataFrame:
+    """OHLCV DataFrame of n 5m bars with GBM closes, indexed by datetime like bar_store frames."""
+    rng = np.random.default_rng(seed)
+    close = START_PRICE * np.exp(np.cumsum(rng.normal(0.0, BAR_SIGMA, n)))
+    open_ = np.r_[START_PRICE, close[:-1]]
+    wick = np.abs(rng.normal(0.0, BAR_SIGMA / 2, (2, n))) * close
+    index = pd.date_range("2020-01-01", periods=n, freq="5min", name="datetime")
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + wick[0],
+        "Low": np.minimum(open_, close) - wick[1],
+        "Close": close,
+        "Volume": rng.integers(1, 500, n).astype(np.float64),
+    }, index=index)
+
+
+def write_bar_csv(df: pd.DataFrame, path: str) -> None:
+    """Write bars in the dataset CSV layout (Date YYYY.MM.DD, Time HH:MM, OHLCV)."""
+    out = pd.DataFrame({"Date": df.index.strftime("%Y.%m.%d"), "Time": df.index.strftime("%H:%M")})
+    for col in df.columns:
+        out[col] = df[col].to_numpy()
+    out.to_csv(path, index=False, float_format="%.3f")
+
+
+class BenchContext:
+    """Synthetic bars, their CSV and a private bar-store cache root, shared by all cases."""
+
+    def __init__(self, n_bars: int = N_BARS, seed: int = SEED):
+        self.work_dir = tempfile.mkdtemp(prefix="gold_quant_bench_")
+        self.bars = synthetic_bars(n_bars, seed)
+        self.csv_path = os.path.join(self.work_dir, "synthetic_5m.csv")
+        self.cache_root = os.path.join(self.work_dir, "cache")
+        write_bar_csv(self.bars, self.csv_path)
+
+    def close(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+# === Cases ===
+@case("load_price_csv")
+def _load_price_csv(ctx):
+    from bar_store import load_bars, open_bar_store
+
+    def run():
+        open_bar_store(ctx.csv_path, ctx.cache_root, rebuild=True)   # parse + datetime decode + cache
+        return load_bars(ctx.csv_path, cache_root=ctx.cache_root)
+    return run
+
+
+@case("load_price_csv_cached")
+def _load_price_csv_cached(ctx):
+    from bar_store import load_bars, open_bar_store
+    open_bar_store(ctx.csv_path, ctx.cache_root)
+    return lambda: load_bars(ctx.csv_path, cache_root=ctx.cache_root)
+
+
+@case("create_dataset")
+def _create_dataset(ctx):
+    from sklearn.preprocessing import MinMaxScaler
+    from windowing import window_views
+    series = ctx.bars["Close"].to_numpy()[-DL_BARS:].reshape(-1, 1)
+
+    def run():
+        scaled = MinMaxScaler().fit_transform(series).astype(np.float32)
+        X, y = window_views(scaled, DL_LOOKBACK)
+        return float(X[-1].sum() + y[-1])
+    return run
+
+
+@case("arima_grid_search")
+def _arima_grid_search(ctx):
+    from model_arima_garch import arima_grid_search, prepare_log_returns
+    log_ret = prepare_log_returns(ctx.bars["Close"].iloc[-MODEL_BARS:]).reset_index(drop=True)
+    return lambda: arima_grid_search(log_ret, *ARIMA_GRID, n_workers=1)
+
+
+@case("arima_grid_search_parallel")
+def _arima_grid_search_parallel(ctx):
+    from model_arima_garch import arima_grid_search, prepare_log_returns
+    log_ret = prepare_log_returns(ctx.bars["Close"].iloc[-MODEL_BARS:]).reset_index(drop=True)
+    return lambda: arima_grid_search(log_ret, *ARIMA_GRID, n_workers=ARIMA_WORKERS)
+
+
+@case("fit_garch_on_residuals")
+def _fit_garch_on_residuals(ctx):
+    from model_arima_garch import fit_garch_on_residuals, prepare_log_returns
+    residuals = prepare_log_returns(ctx.bars["Close"].iloc[-MODEL_BARS:]).reset_index(drop=True) * 1000.0
+    residuals -= residuals.mean()
+    return lambda: fit_garch_on_residuals(residuals)
+
+
+@case("monte_carlo_gbm")
+def _monte_carlo_gbm(ctx):
+    from model_gbm_montecarlo import monte_carlo_gbm, compute_statistics, prepare_log_returns
+    log_ret = prepare_log_returns(ctx.bars["Close"])
+    last, mu, sigma = float(ctx.bars["Close"].iloc[-1]), float(log_ret.mean()), float(log_ret.std())
+
+    def run():
+        paths = monte_carlo_gbm(last, mu, sigma, MC_STEPS, MC_PATHS, rng=np.random.default_rng(SEED))
+        return compute_statistics(paths)
+    return run
+
+
+def _dl_forecast_case(module_name: str, build_name: str):
+    def setup(ctx):
+        import importlib
+        from sklearn.preprocessing import MinMaxScaler
+        from mc_dropout import make_mc_step
+        module = importlib.import_module(module_name)
+        model = getattr(module, build_name)(module.LOOKBACK)
+        series = ctx.bars["Close"].to_numpy()[-DL_BARS:].reshape(-1, 1)
+        scaler = MinMaxScaler().fit(series)
+        last_window = scaler.transform(series[-module.LOOKBACK:]).astype(np.float32).reshape(1, -1, 1)
+        step_fn = make_mc_step(model, module.LOOKBACK)
+        return lambda: module.forecast_with_uncertainty(model, last_window, module.FORECAST_STEPS, scaler,
+                                                        n_sim=DL_SIMULATIONS, step_fn=step_fn)
+    return setup
+
+
+case("forecast_lstm_gru")(_dl_forecast_case("model_lstm_gru", "build_model"))
+case("forecast_transformer")(_dl_forecast_case("model_transformer", "build_transformer_model"))
+
+
+@case("backtest_backtrader")
+def _backtest_backtrader(ctx):
+    from backtest_strategy import run_strategy
+    return lambda: run_strategy(ctx.bars)
+
+
+@case("backtest_vector")
+def _backtest_vector(ctx):
+    from vector_backtest import run_backtest
+    return lambda: run_backtest(ctx.bars)
+
+
+# === Runner ===
+def time_case(run, repeat: int = REPEAT) -> dict:
+    """Peak traced memory of one run (also the warm-up), then wall time over `repeat` runs."""
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    return {
+        "seconds_min": min(times),
+        "seconds_median": float(np.median(times)),
+        "peak_mb": peak / 2**20,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(names=None, n_bars: int = N_BARS, repeat: int = REPEAT, seed: int = SEED) -> dict:
+    """Run the selected cases (all by default) and return the results document."""
+    names = list(names or CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise KeyError(f"Unknown cases {unknown}; available: {', '.join(CASES)}")
+    ctx = BenchContext(n_bars, seed)
+    results = {}
+    try:
+        for name in names:
+            try:
+                run = CASES[name](ctx)
+            except ImportError as e:
+                logging.info("%-24s skipped (%s)", name, e)
+                results[name] = {"skipped": str(e)}
+                continue
+            logging.disable(logging.INFO)   # keep the cases' own INFO logging out of the measurement
+            try:
+                results[name] = time_case(run, repeat)
+            finally:
+                logging.disable(logging.NOTSET)
+            logging.info("%-24s median %8.4fs  min %8.4fs  peak %8.1f MB", name,
+                         results[name]["seconds_median"], results[name]["seconds_min"], results[name]["peak_mb"])
+    finally:
+        ctx.close()
+    return {
+        "meta": {
+            "bars": n_bars,
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(doc: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> pd.DataFrame:
+    """Per-case current/baseline ratios of median time and peak memory; `regression` marks ratios above 1 + tolerance."""
+    if doc["meta"]["bars"] != baseline["meta"].get("bars"):
+        logging.warning("Baseline was recorded on %s bars, this run on %d; ratios are not comparable",
+                        baseline["meta"].get("bars"), doc["meta"]["bars"])
+    rows = []
+    for name, cur in doc["results"].items():
+        base = baseline["results"].get(name)
+        if "skipped" in cur or not base or "skipped" in base:
+            continue
+        time_ratio = cur["seconds_median"] / base["seconds_median"]
+        mem_ratio = cur["peak_mb"] / base["peak_mb"] if base["peak_mb"] > 0 else 1.0
+        rows.append({"case": name, "seconds": cur["seconds_median"], "baseline_seconds": base["seconds_median"],
+                     "time_ratio": time_ratio, "peak_mb": cur["peak_mb"], "memory_ratio": mem_ratio,
+                     "regression": max(time_ratio, mem_ratio) > 1.0 + tolerance})
+    return pd.DataFrame(rows)
+
+
+def write_json(doc: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+
+
+# === Main ===
+def setup_logging():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark gold_quant hot paths on synthetic bars")
+    parser.add_argument("--bars", type=int, default=N_BARS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--cases", nargs="*", help=f"subset of: {', '.join(CASES)}")
+    parser.add_argument("--out", default=RESULTS_JSON)
+    parser.add_argument("--baseline", default=BASELINE_JSON)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    doc = run_benchmarks(args.cases, args.bars, args.repeat, args.seed)
+    write_json(doc, args.out)
+    logging.info("Results saved to %s", args.out)
+    if args.save_baseline:
+        write_json(doc, args.baseline)
+        logging.info("Baseline saved to %s", args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        logging.info("No baseline at %s; run with --save-baseline to record one", args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        table = compare_to_baseline(doc, json.load(f))
+    if table.empty:
+        logging.info("No cases in common with the baseline")
+        return 0
+    logging.info("Comparison with %s:\n%s", args.baseline, table.round(3).to_string(index=False))
+    regressions = table.loc[table["regression"], "case"].tolist()
+    if regressions:
+        logging.warning("Regressions beyond %.0f%%: %s", REGRESSION_TOLERANCE * 100, ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+scripts/daily_store.py
+
+Typed cached loader for dataset/xauusd_daily.csv (daily gold price in 19 currencies).
+- Parses the M/D/YYYY dates, "#N/A" quotes and quoted thousands ("43,164.9") once.
+- Caches int64 epoch timestamps, a float64 (rows x currencies) price block and its validity mask
+  as .npy files under dataset/cache/xauusd_daily/, rebuilt when the CSV changes (same scheme as bar_store.py).
+- Reopens the cache memory-mapped; every currency shares one date index, missing quotes are NaN.
+- Serves the block as float32 or float64, per-currency series, and return matrices aligned on the
+  common date index, so analytics and models can run over all currencies at once.
+"""
+
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bar_store import (CACHE_ROOT, TIMESTAMP_COLUMN, cache_dir_for, cache_is_fresh, read_meta,
+                       source_fingerprint, write_columns)
+
+# === Configurations ===
+DAILY_PATH = os.path.join("dataset", "xauusd_daily.csv")
+CURRENCIES = ("USD", "EUR", "JPY", "GBP", "CAD", "CHF", "INR", "CNY", "TRY", "SAR",
+              "IDR", "AED", "THB", "VND", "EGP", "KRW", "RUB", "ZAR", "AUD")
+DATE_FORMAT = "%m/%d/%Y"
+NA_VALUES = ("#N/A",)
+PRICE_BLOCK = "prices"
+VALID_MASK = "valid"
+
+
+# === Parsing ===
+def parse_daily_csv(path: str) -> tuple:
+    """Parse the daily CSV into {timestamp, prices, valid} arrays plus the currency list, sorted by date."""
+    df = pd.read_csv(path, na_values=list(NA_VALUES), thousands=",")
+    currencies = [c for c in df.columns if c != "Date"]
+    dates = pd.to_datetime(df["Date"], format=DATE_FORMAT).to_numpy().astype("datetime64[s]")
+    prices = df[currencies].to_numpy(dtype=np.float64)
+    order = np.argsort(dates, kind="stable")
+    prices = prices[order]
+    return {
+        TIMESTAMP_COLUMN: dates[order].astype(np.int64),
+        PRICE_BLOCK: prices,
+        VALID_MASK: ~np.isnan(prices),
+    }, currencies
+
+
+def build_daily_cache(csv_path: str, cache_dir: str) -> None:
+    """Parse csv_path once and write the cache."""
+    logging.info("Building daily cache for %s", csv_path)
+    columns, currencies = parse_daily_csv(csv_path)
+    write_columns(cache_dir, columns, {"source": csv_path, "fingerprint": source_fingerprint(csv_path),
+                                       "currencies": currencies})
+    logging.info("Daily cache written to %s (%d days x %d currencies)",
+                 cache_dir, len(columns[TIMESTAMP_COLUMN]), len(currencies))
+
+
+# === Store ===
+class DailyStore:
+    """Memory-mapped daily price block: one date index, one column per currency, NaN where missing."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.meta = read_meta(cache_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"Daily cache not found: {cache_dir}")
+        self.timestamps, self.prices, self.valid = (
+            np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+            for name in (TIMESTAMP_COLUMN, PRICE_BLOCK, VALID_MASK)
+        )
+        self.currencies = tuple(self.meta["currencies"])
+        self._col = {c: i for i, c in enumerate(self.currencies)}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(np.asarray(self.timestamps).astype("datetime64[s]").astype("datetime64[ns]"),
+                                name="Date")
+
+    def columns_for(self, currencies=None) -> list:
+        """Column positions of currencies (all when None); unknown names raise KeyError."""
+        if currencies is None:
+            return list(range(len(self.currencies)))
+        if isinstance(currencies, str):
+            currencies = [currencies]
+        missing = [c for c in currencies if c not in self._col]
+        if missing:
+            raise KeyError(f"Unknown currencies {missing}; available: {', '.join(self.currencies)}")
+        return [self._col[c] for c in currencies]
+
+    def block(self, currencies=None, dtype=np.float64) -> np.ndarray:
+        """(days x currencies) price matrix in dtype (float32 halves the memory), NaN where missing."""
+        return np.asarray(self.prices[:, self.columns_for(currencies)], dtype=dtype)
+
+    def mask(self, currencies=None) -> np.ndarray:
+        """(days x currencies) boolean matrix, True where a quote exists."""
+        return np.asarray(self.valid[:, self.columns_for(currencies)])
+
+    def frame(self, currencies=None, dtype=np.float64) -> pd.DataFrame:
+        """Prices as a DataFrame indexed by date, NaN where missing."""
+        names = [self.currencies[i] for i in self.columns_for(currencies)]
+        return pd.DataFrame(self.block(currencies, dtype), index=self.dates, columns=names)
+
+    def column(self, currency: str) -> pd.Series:
+        """Price series of one currency with its missing days dropped."""
+        i = self.columns_for(currency)[0]
+        keep = np.asarray(self.valid[:, i])
+        return pd.Series(np.asarray(self.prices[keep, i]), index=self.dates[keep], name=currency)
+
+    def returns(self, currencies=None, log=True, dtype=np.float64) -> np.ndarray:
+        """
+        (days x currencies) return matrix on the shared date index.
+        Each return is taken from that currency's previous quoted day, so an isolated #N/A
+        leaves one NaN row instead of two; rows without a quote (and the first quote) are NaN.
+        """
+        prices = self.block(currencies)
+        valid = self.mask(currencies)
+        rows = np.arange(len(prices))[:, None]
+        last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        prev = np.vstack([np.full((1, prices.shape[1]), -1), last[:-1]])
+        ok = valid & (prev >= 0)
+        prev_price = np.take_along_axis(prices, np.maximum(prev, 0), axis=0)
+        out = np.full(prices.shape, np.nan)
+        out[ok] = np.log(prices[ok] / prev_price[ok]) if log else prices[ok] / prev_price[ok] - 1.0
+        return out.astype(dtype, copy=False)
+
+    def aligned_returns(self, currencies=None, log=True, dtype=np.float64) -> pd.DataFrame:
+        """Returns of the chosen currencies on the days where all of them have one (no NaNs)."""
+        names = [self.currencies[i] for i in self.columns_for(currencies)]
+        rets = self.returns(currencies, log, dtype)
+        keep = ~np.isnan(rets).any(axis=1)
+        return pd.DataFrame(rets[keep], index=self.dates[keep], columns=names)
+
+    def return_moments(self, currencies=None, log=True) -> pd.DataFrame:
+        """Per-currency count, mean and std of daily returns (NaN-aware), e.g. GBM drift/vol for every series."""
+        names = [self.currencies[i] for i in self.columns_for(currencies)]
+        rets = self.returns(currencies, log)
+        n = (~np.isnan(rets)).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(rets, axis=0) / n
+            std = np.sqrt(np.nansum((rets - mean) ** 2, axis=0) / (n - 1))
+        return pd.DataFrame({"n": n, "mu": mean, "sigma": std}, index=names)
+
+
+def open_daily_store(csv_path: str = DAILY_PATH, cache_root: str = CACHE_ROOT, rebuild=False) -> DailyStore:
+    """Open the memory-mapped daily cache, building it on first use or when the CSV has changed."""
+    cache_dir = cache_dir_for(csv_path, cache_root)
+    if rebuild or not cache_is_fresh(read_meta(cache_dir), csv_path):
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+        build_daily_cache(csv_path, cache_dir)
+    return DailyStore(cache_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    store = open_daily_store(sys.argv[1] if len(sys.argv) > 1 else DAILY_PATH, rebuild=True)
+    coverage = pd.Series(store.mask().mean(axis=0), index=store.currencies)
+    logging.info("%d days x %d currencies, coverage:\n%s", len(store), len(store.currencies),
+                 coverage.round(3).to_string())
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+scripts/forecast_service.py
+
+Long-running forecast daemon: loads the bar store and forecasters once and serves requests over
+local HTTP (HOST:PORT) or a Unix socket with asyncio.
+- GET /forecast?model=gbm&horizon=50&conf=0.95&paths=1000 -> JSON mean/lower/upper price bands.
+  Models: arima-garch, gbm, lstm-gru, transformer (the DL models need a trained artifact in tmp/models/).
+- GET /metrics -> per-model request counts, cache hits, coalesced requests, batch sizes and latency percentiles.
+- GET /health -> loaded models and last bar timestamp.
+- Results are cached per (model, last bar timestamp, horizon, conf, paths); identical in-flight
+  requests share one computation. arima-garch bands are analytic, so paths is not part of its key.
+- Requests arriving within BATCH_WINDOW per model run as one batch; MC Dropout batches share
+  simulations (max horizon, summed paths), split so no simulation exceeds the model's MAX_PATHS.
+- Forecasts run in a thread pool so the event loop keeps accepting connections.
+- Logs to logs/forecast_service.txt.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import importlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from bar_store import open_bar_store
+from instrument import run_summary
+
+# === Configurations ===
+DATA_PATH = "dataset/xauusd_5m.csv"
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "forecast_service.txt")
+
+HOST = "127.0.0.1"
+PORT = 8765
+SOCKET_PATH = None          # serve on this Unix socket instead of HOST:PORT
+MODELS = ("arima-garch", "gbm", "lstm-gru", "transformer")
+BAR_SECONDS = 300           # 5m bars, for forecast timestamps
+REFRESH_SECONDS = 1.0       # minimum interval between bar store freshness checks
+CACHE_SIZE = 256            # cached forecast results
+BATCH_WINDOW = 0.005        # seconds to collect concurrent requests per model into one batch
+SERVICE_THREADS = 2
+LATENCY_WINDOW = 1000       # latencies kept per model for percentiles
+DEFAULT_HORIZON = 50
+DEFAULT_CONF = 0.95
+DEFAULT_PATHS = 1000
+MAX_HORIZON = 500
+MAX_PATHS = {               # per request and per shared simulation; models not listed ignore paths
+    "gbm": 10_000_000,      # streamed in chunks
+    # MC Dropout holds every path in memory (float32 buffer plus a float64 copy)
+    "lstm-gru": 20_000,
+    "transformer": 20_000,
+}
+ARIMA_DEFAULT_ORDER = (1, 0, 1)  # used when no saved ARIMA+GARCH state exists for the served data
+
+
+def setup_logging():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
+
+
+class ModelUnavailable(Exception):
+    """Requested model is unknown or failed to load."""
+
+
+def _bands(paths: np.ndarray, conf: float):
+    """Mean and central CI of (n_paths, horizon) simulated values."""
+    lower, upper = np.percentile(paths, [50 - conf * 50, 50 + conf * 50], axis=0)
+    return paths.mean(axis=0), lower, upper
+
+
+# === Forecasters ===
+class Forecaster(ABC):
+    """forecast(store, horizon, conf, paths) -> (mean, lower, upper) price arrays of length horizon."""
+
+    @abstractmethod
+    def forecast(self, store, horizon: int, conf: float, paths: int):
+        """Bands for one request on the given bar store."""
+
+    def forecast_many(self, store, requests: list) -> list:
+        """Results for a batch of (horizon, conf, paths) requests on the same bars."""
+        return [self.forecast(store, *r) for r in requests]
+
+
+class GbmForecaster(Forecaster):
+    """Monte Carlo GBM with mu/sigma re-estimated from the latest SUBSAMPLE_SIZE closes."""
+
+    def __init__(self, data_path):
+        self.gbm = importlib.import_module("model_gbm_montecarlo")
+
+    def forecast(self, store, horizon, conf, paths):
+        close = np.asarray(store["Close"][-self.gbm.SUBSAMPLE_SIZE:], dtype=float)
+        log_ret = np.diff(np.log(close))
+        return self.gbm.simulate_gbm_bands(close[-1], log_ret.mean(), log_ret.std(ddof=1), horizon, paths,
+                                           conf_level=conf, n_workers=1)
+
+
+class ArimaGarchForecaster(Forecaster):
+    """
+    ARIMA+GARCH from the saved model state (or ARIMA_DEFAULT_ORDER fitted once): each new bar only
+    re-runs the Kalman filter and the GARCH recursion with fixed parameters.
+    """
+
+    def __init__(self, data_path):
+        self.mag = importlib.import_module("model_arima_garch")
+        from arch import arch_model
+        self.arch_model = arch_model
+        state = self.mag.load_model_state(self.mag.STATE_PATH, self.mag.state_key(data_path))
+        self.order = tuple(state["order"]) if state else ARIMA_DEFAULT_ORDER
+        self.arima_params = np.asarray(state["arima_params"]) if state else None
+        self.garch_params = state.get("garch_params") if state else None
+        self.fitted_for = None
+        self.models = None
+
+    def _update(self, store):
+        last = int(store.timestamps[-1])
+        if self.fitted_for == last:
+            return
+        close = np.asarray(store["Close"][-self.mag.SUBSAMPLE_SIZE:], dtype=float)
+        log_ret = np.diff(np.log(close))
+        arima = self.mag.ARIMA(log_ret, order=self.order)
+        if self.arima_params is None:
+            arima_res = arima.fit(method_kwargs={"warn_convergence": False})
+            self.arima_params = np.asarray(arima_res.params)
+        else:
+            arima_res = arima.filter(self.arima_params)
+        resid = np.asarray(arima_res.resid)
+        if self.garch_params is None:
+            self.garch_params = np.asarray(self.mag.fit_garch_on_residuals(
+                resid, p=self.mag.GARCH_P, q=self.mag.GARCH_Q).params)
+        garch_res = self.arch_model(resid, vol="GARCH", p=self.mag.GARCH_P, q=self.mag.GARCH_Q,
+                                    dist="normal", mean="Zero").fix(self.garch_params)
+        self.models = (arima_res, garch_res, close[-1])
+        self.fitted_for = last
+
+    def forecast(self, store, horizon, conf, paths):
+        self._update(store)
+        arima_res, garch_res, last_price = self.models
+        out = self.mag.forecast_arima_garch(arima_res, garch_res, steps=horizon, last_price=last_price)
+        return self.mag.reconstruct_prices(last_price, out["mean_return"].values, out["var"].values,
+                                           norm.ppf(0.5 + conf / 2.0))
+
+
+class DropoutForecaster(Forecaster):
+    """LSTM+GRU / Transformer from the newest registry artifact with a pre-traced MC Dropout step."""
+
+    def __init__(self, data_path, module_name, max_paths):
+        mod = importlib.import_module(module_name)
+        from model_registry import find_artifact, load_artifact
+        from mc_dropout import make_mc_step, mc_dropout_paths
+        artifact = find_artifact(mod.MODEL_NAME, dict(mod.MODEL_CONFIG, data=data_path))
+        if artifact is None:
+            raise RuntimeError(f"no trained {mod.MODEL_NAME} artifact; run scripts/{module_name}.py first")
+        self.model, self.scaler = load_artifact(artifact)
+        self.lookback = mod.LOOKBACK
+        self.step = make_mc_step(self.model, self.lookback)
+        self.paths = mc_dropout_paths
+        self.max_paths = max_paths
+
+    def _simulate(self, store, horizon, n_sim):
+        close = np.asarray(store["Close"][-self.lookback:], dtype=float).reshape(-1, 1)
+        window = self.scaler.transform(close).reshape(1, self.lookback, 1)
+        scaled = self.paths(self.model, window, horizon, n_sim, step_fn=self.step)
+        return self.scaler.inverse_transform(scaled.reshape(-1, 1)).reshape(scaled.shape)
+
+    def forecast(self, store, horizon, conf, paths):
+        return _bands(self._simulate(store, horizon, paths), conf)
+
+    def forecast_many(self, store, requests):
+        """
+        Shared simulations for the batch: consecutive requests are grouped up to max_paths summed
+        paths, and each group runs once at its longest horizon, split per request.
+        """
+        results, group, group_paths = [], [], 0
+        for request in requests + [None]:
+            if group and (request is None or group_paths + request[2] > self.max_paths):
+                sims = self._simulate(store, max(r[0] for r in group), group_paths)
+                start = 0
+                for horizon, conf, paths in group:
+                    results.append(_bands(sims[start:start + paths, :horizon], conf))
+                    start += paths
+                group, group_paths = [], 0
+            if request is not None:
+                group.append(request)
+                group_paths += request[2]
+        return results
+
+
+FORECASTERS = {
+    "arima-garch": ArimaGarchForecaster,
+    "gbm": GbmForecaster,
+    "lstm-gru": lambda data_path: DropoutForecaster(data_path, "model_lstm_gru", MAX_PATHS["lstm-gru"]),
+    "transformer": lambda data_path: DropoutForecaster(data_path, "model_transformer", MAX_PATHS["transformer"]),
+}
+
+
+# === Service ===
+class ServiceMetrics:
+    """Per-model counters and recent latencies."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.time()
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.batch_sizes = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, model: str, latency: float, outcome: str) -> None:
+        self.counts[model]["requests"] += 1
+        self.counts[model][outcome] += 1
+        self.latencies[model].append(latency)
+
+    def snapshot(self) -> dict:
+        out = {"uptime_s": round(time.time() - self.started, 1), "models": {}}
+        for model, counts in self.counts.items():
+            lat = np.asarray(self.latencies[model]) * 1000.0
+            batches = np.asarray(self.batch_sizes[model]) if self.batch_sizes[model] else np.zeros(1)
+            out["models"][model] = dict(
+                counts,
+                latency_ms={
+                    "mean": round(float(lat.mean()), 3),
+                    "p50": round(float(np.percentile(lat, 50)), 3),
+                    "p95": round(float(np.percentile(lat, 95)), 3),
+                    "p99": round(float(np.percentile(lat, 99)), 3),
+                    "max": round(float(lat.max()), 3),
+                } if len(lat) else {},
+                mean_batch_size=round(float(batches.mean()), 2),
+            )
+        return out
+
+
+class ForecastService:
+    def __init__(self, data_path=DATA_PATH, models=MODELS, cache_size=CACHE_SIZE):
+        self.data_path = data_path
+        self.model_names = models
+        self.store = open_bar_store(data_path)
+        self.checked = time.monotonic()
+        self.forecasters = {}
+        self.errors = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.inflight = {}
+        self.queues = {}
+        self.metrics = ServiceMetrics()
+        self.executor = ThreadPoolExecutor(SERVICE_THREADS)
+
+    def warm_up(self) -> None:
+        """Build every configured forecaster; failures leave that model unavailable."""
+        for name in self.model_names:
+            t0 = time.perf_counter()
+            try:
+                forecaster = FORECASTERS[name](self.data_path)
+                forecaster.forecast(self.store, 2, DEFAULT_CONF, 2)  # first call fits/traces
+                self.forecasters[name] = forecaster
+                logging.info("Loaded %s in %.2fs", name, time.perf_counter() - t0)
+            except Exception as e:
+                self.errors[name] = str(e)
+                logging.warning("Model %s unavailable: %s", name, e)
+
+    def refresh(self) -> None:
+        """Reopen the bar store (at most every REFRESH_SECONDS) so new bars are picked up."""
+        now = time.monotonic()
+        if now - self.checked >= REFRESH_SECONDS:
+            self.store = open_bar_store(self.data_path)
+            self.checked = now
+
+    async def forecast(self, model: str, horizon: int, conf: float, paths: int) -> dict:
+        t0 = time.perf_counter()
+        if model not in self.forecasters:
+            raise ModelUnavailable(self.errors.get(model, f"unknown model {model}"))
+        if model not in MAX_PATHS:
+            paths = None
+        self.refresh()
+        store = self.store
+        key = (model, int(store.timestamps[-1]), horizon, conf, paths)
+        outcome = "cache_hits"
+        try:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                bands = self.cache[key]
+            elif key in self.inflight:
+                outcome = "coalesced"
+                bands = await asyncio.shield(self.inflight[key])
+            else:
+                outcome = "computed"
+                bands = await self._submit(key, store)
+        except Exception:
+            self.metrics.record(model, time.perf_counter() - t0, "errors")
+            raise
+        latency = time.perf_counter() - t0
+        self.metrics.record(model, latency, outcome)
+        return self._response(key, bands, outcome != "computed", latency)
+
+    async def _submit(self, key, store):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.inflight[key] = future
+        queue = self.queues.get(key[0])
+        if queue is None:
+            queue = self.queues[key[0]] = asyncio.Queue()
+            loop.create_task(self._batcher(key[0], queue))
+        await queue.put((key, store, future))
+        try:
+            bands = await asyncio.shield(future)
+        finally:
+            self.inflight.pop(key, None)
+        self.cache[key] = bands
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return bands
+
+    async def _batcher(self, model: str, queue: asyncio.Queue) -> None:
+        """Collect a model's requests for BATCH_WINDOW, then run them as one batch per bar store."""
+        loop = asyncio.get_running_loop()
+        forecaster = self.forecasters[model]
+        while True:
+            batch = [await queue.get()]
+            await asyncio.sleep(BATCH_WINDOW)
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            self.metrics.batch_sizes[model].append(len(batch))
+            by_store = defaultdict(list)
+            for item in batch:
+                by_store[id(item[1])].append(item)
+            for items in by_store.values():
+                requests = [item[0][2:] for item in items]
+                try:
+                    results = await loop.run_in_executor(self.executor, forecaster.forecast_many,
+                                                         items[0][1], requests)
+                except Exception as e:
+                    logging.exception("Forecast batch for %s failed", model)
+                    results = [e] * len(items)
+                for (_, _, future), result in zip(items, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(tuple(np.asarray(b, dtype=float) for b in result))
+
+    @staticmethod
+    def _response(key, bands, cached: bool, latency: float) -> dict:
+        model, last_ts, horizon, conf, paths = key
+        index = pd.to_datetime(last_ts + BAR_SECONDS * np.arange(1, horizon + 1), unit="s")
+        mean, lower, upper = bands
+        return {
+            "model": model,
+            "last_timestamp": str(pd.Timestamp(last_ts, unit="s")),
+            "horizon": horizon,
+            "conf_level": conf,
+            "paths": paths,
+            "index": [str(t) for t in index],
+            "price_mean": mean.tolist(),
+            "price_lower": lower.tolist(),
+            "price_upper": upper.tolist(),
+            "cached": cached,
+            "latency_ms": round(latency * 1000.0, 3),
+        }
+
+    def health(self) -> dict:
+        return {
+            "models": sorted(self.forecasters),
+            "unavailable": self.errors,
+            "bars": len(self.store),
+            "last_timestamp": str(pd.Timestamp(int(self.store.timestamps[-1]), unit="s")),
+        }
+
+
+# === HTTP ===
+def parse_forecast_query(query: dict):
+    """(model, horizon, conf, paths) from query parameters; raises ValueError on bad input."""
+    model = query.get("model", ["gbm"])[0]
+    horizon = int(query.get("horizon", [DEFAULT_HORIZON])[0])
+    conf = round(float(query.get("conf", [DEFAULT_CONF])[0]), 6)
+    paths = int(query.get("paths", [DEFAULT_PATHS])[0])
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be in [1, {MAX_HORIZON}]")
+    if not 0.0 < conf < 1.0:
+        raise ValueError("conf must be in (0, 1)")
+    max_paths = MAX_PATHS.get(model)
+    if max_paths is not None and not 1 <= paths <= max_paths:
+        raise ValueError(f"paths must be in [1, {max_paths}] for {model}")
+    return model, horizon, conf, paths
+
+
+def _http_response(status: str, body: dict) -> bytes:
+    payload = json.dumps(body).encode()
+    head = (f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n")
+    return head.encode() + payload
+
+
+async def handle_connection(service: ForecastService, reader, writer) -> None:
+    """Serve one HTTP/1.1 GET request per connection."""
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        if len(request_line) < 2 or request_line[0] != "GET":
+            response = _http_response("405 Method Not Allowed", {"error": "only GET is supported"})
+        else:
+            url = urlsplit(request_line[1])
+            if url.path == "/forecast":
+                try:
+                    params = parse_forecast_query(parse_qs(url.query))
+                    response = _http_response("200 OK", await service.forecast(*params))
+                except ValueError as e:
+                    response = _http_response("400 Bad Request", {"error": str(e)})
+                except ModelUnavailable as e:
+                    response = _http_response("404 Not Found", {"error": str(e)})
+                except Exception as e:
+                    response = _http_response("500 Internal Server Error", {"error": str(e)})
+            elif url.path == "/metrics":
+                response = _http_response("200 OK", service.metrics.snapshot())
+            elif url.path == "/health":
+                response = _http_response("200 OK", service.health())
+            else:
+                response = _http_response("404 Not Found", {"error": f"unknown path {url.path}"})
+        writer.write(response)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(data_path=DATA_PATH, models=MODELS, host=HOST, port=PORT, socket_path=SOCKET_PATH):
+    """Warm up the forecasters and serve until cancelled."""
+    service = ForecastService(data_path, models)
+    service.warm_up()
+
+    async def handler(reader, writer):
+        await handle_connection(service, reader, writer)
+
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        logging.info("Serving %s on unix socket %s", sorted(service.forecasters), socket_path)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        logging.info("Serving %s on http://%s:%d", sorted(service.forecasters), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XAUUSD forecast service")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path (overrides host/port)")
+    parser.add_argument("--models", default=",".join(MODELS), help="comma-separated models to load")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.data, tuple(m for m in args.models.split(",") if m),
+                          args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        logging.info("Service stopped.")
+
+
+# === Main ===
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("forecast_service"):
+        main()
@@ -2,85 +2,197 @@
 """
 scripts/genetic_algorithm.py
 
-Illustrative Genetic Algorithm simulation for learning purposes.
-- Maximizes a simple fitness function.
-- Includes logging for all steps.
-- Does not require external dataset.
+Genetic algorithm over EMA_RSI_MACD parameters, scored with the vectorized backtest engine.
+- The population is an integer NumPy array (individuals x genes, genes ordered as PARAM_NAMES) bounded by GENE_BOUNDS.
+- Fitness (Sharpe by default) is computed once per generation; parents are picked by vectorized
+  tournament selection, children by uniform crossover and bounded integer mutation over the whole array.
+- Genomes are repaired to valid strategies (ema_fast < ema_slow, macd_fast < macd_slow).
+- New genomes are backtested in parallel over a process pool (the param_sweep.py workers, which memory-map
+  the bar store and share an IndicatorCache); a memo keeps every evaluated genome, so revisits cost nothing.
+- Deterministic for a given SEED; writes every evaluated genome ranked by fitness to
+  backtest/genetic_algorithm.csv; logs to logs/genetic_algorithm_log.txt.
 """
 
-import logging
-import random
 import os
+import logging
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
 
-# Setup logging
+import param_sweep
+from bar_store import open_bar_store
+from param_sweep import PARAM_NAMES, METRIC_NAMES, evaluate
+from instrument import stage, count, timed, run_summary
+
+# === Configurations ===
+DATA_PATH = "dataset/xauusd_5m.csv"
+BACKTEST_DIR = "backtest"
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "genetic_algorithm_log.txt")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [INFO] %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, mode='w')
-    ]
+RESULTS_OUT_CSV = os.path.join(BACKTEST_DIR, "genetic_algorithm.csv")
+
+GENE_BOUNDS = dict(           # inclusive integer range per parameter
+    ema_fast=(3, 20),
+    ema_slow=(8, 60),
+    rsi_period=(5, 30),
+    rsi_overbought=(55, 85),
+    rsi_oversold=(15, 45),
+    macd_fast=(5, 20),
+    macd_slow=(20, 50),
+    macd_signal=(5, 15),
 )
+POPULATION_SIZE = 40
+GENERATIONS = 15
+TOURNAMENT_SIZE = 3
+CROSSOVER_RATE = 0.9
+MUTATION_RATE = 0.15          # per gene
+MUTATION_SCALE = 0.1          # std of a mutation step as a fraction of the gene range
+ELITE = 2                     # best individuals copied unchanged into the next generation
+FITNESS = "sharpe"
+SEED = 42
+N_WORKERS = os.cpu_count()
+TASK_CHUNKSIZE = 4
+TOP_N = 10
+
+LOWER = np.array([GENE_BOUNDS[name][0] for name in PARAM_NAMES])
+UPPER = np.array([GENE_BOUNDS[name][1] for name in PARAM_NAMES])
+_GENE = {name: i for i, name in enumerate(PARAM_NAMES)}
+
+
+# === GA operations (whole population at once) ===
+def repair(pop: np.ndarray) -> np.ndarray:
+    """Clip genes to GENE_BOUNDS and push slow periods above their fast counterparts."""
+    pop = np.clip(pop, LOWER, UPPER)
+    for fast, slow in (("ema_fast", "ema_slow"), ("macd_fast", "macd_slow")):
+        f, s = _GENE[fast], _GENE[slow]
+        pop[:, f] = np.minimum(pop[:, f], UPPER[s] - 1)
+        pop[:, s] = np.maximum(pop[:, s], pop[:, f] + 1)
+    return pop
+
+
+def random_population(rng: np.random.Generator, size: int = POPULATION_SIZE) -> np.ndarray:
+    return repair(rng.integers(LOWER, UPPER + 1, size=(size, len(PARAM_NAMES))))
+
+
+def tournament_select(fitness: np.ndarray, n: int, rng: np.random.Generator, k: int = TOURNAMENT_SIZE) -> np.ndarray:
+    """Indices of n parents, each the fittest of k individuals drawn at random."""
+    entrants = rng.integers(0, len(fitness), size=(n, k))
+    return entrants[np.arange(n), np.argmax(fitness[entrants], axis=1)]
+
+
+def crossover(parents_a: np.ndarray, parents_b: np.ndarray, rng: np.random.Generator,
+              rate: float = CROSSOVER_RATE):
+    """Uniform crossover of paired parent rows; pairs skipped with probability 1 - rate are copied."""
+    swap = rng.random(parents_a.shape) < 0.5
+    swap &= (rng.random(len(parents_a)) < rate)[:, None]
+    return np.where(swap, parents_b, parents_a), np.where(swap, parents_a, parents_b)
+
+
+def mutate(pop: np.ndarray, rng: np.random.Generator, rate: float = MUTATION_RATE,
+           scale: float = MUTATION_SCALE) -> np.ndarray:
+    """Add a rounded Gaussian step (at least +-1) to a random subset of genes."""
+    hit = rng.random(pop.shape) < rate
+    step = np.rint(rng.normal(0.0, scale * (UPPER - LOWER), size=pop.shape)).astype(pop.dtype)
+    step = np.where(step == 0, rng.choice((-1, 1), size=pop.shape), step)
+    return repair(pop + np.where(hit, step, 0))
+
+
+def next_generation(pop: np.ndarray, fitness: np.ndarray, rng: np.random.Generator, elite: int = ELITE) -> np.ndarray:
+    """Elites plus tournament-selected, crossed and mutated children."""
+    n_children = len(pop) - elite
+    n_pairs = (n_children + 1) // 2
+    parents = tournament_select(fitness, 2 * n_pairs, rng)
+    child_a, child_b = crossover(pop[parents[:n_pairs]], pop[parents[n_pairs:]], rng)
+    children = mutate(np.vstack([child_a, child_b])[:n_children], rng)
+    elites = pop[np.argsort(-fitness, kind="stable")[:elite]]
+    return np.vstack([elites, children])
+
+
+# === Fitness ===
+@timed("fit.evaluate")
+def evaluate_population(pop: np.ndarray, memo: dict, pool=None, chunksize: int = TASK_CHUNKSIZE) -> np.ndarray:
+    """
+    Fitness of every individual. Genomes missing from memo are backtested (in pool if given) and
+    added to it as {genome tuple: metrics dict}; failed or NaN scores count as -inf.
+    """
+    genomes = [tuple(int(g) for g in row) for row in pop]
+    pending = list(dict.fromkeys(g for g in genomes if g not in memo))
+    if pending:
+        rows = pool.map(evaluate, pending, chunksize=chunksize) if pool else [evaluate(g) for g in pending]
+        count("backtests", len(pending))
+        for genome, row in zip(pending, rows):
+            memo[genome] = dict(zip(METRIC_NAMES, row[len(PARAM_NAMES):]))
+    fitness = np.array([memo[g][FITNESS] for g in genomes], dtype=np.float64)
+    return np.where(np.isnan(fitness), -np.inf, fitness)
+
+
+def memo_table(memo: dict) -> pd.DataFrame:
+    """All evaluated genomes with their metrics, best first."""
+    table = pd.DataFrame([dict(zip(PARAM_NAMES, g), **m) for g, m in memo.items()])
+    return table.sort_values(FITNESS, ascending=False, kind="stable").reset_index(drop=True)
+
+
+def run_ga(data_path=DATA_PATH, generations=GENERATIONS, population_size=POPULATION_SIZE, seed=SEED,
+           n_workers=N_WORKERS):
+    """Evolve the population and return (best params dict, memo of all evaluated genomes)."""
+    store = open_bar_store(data_path)  # build the cache once, before workers map it
+    rng = np.random.default_rng(seed)
+    memo = {}
+    logging.info("GA over %d bars: population %d, %d generations, %d workers",
+                 len(store), population_size, generations, n_workers)
+
+    pool = mp.Pool(n_workers, initializer=param_sweep._init_worker, initargs=(data_path,)) if n_workers > 1 else None
+    if pool is None:
+        param_sweep._init_worker(data_path)
+    try:
+        pop = random_population(rng, population_size)
+        for gen in range(1, generations + 1):
+            n_known = len(memo)
+            fitness = evaluate_population(pop, memo, pool)
+            n_new = len(memo) - n_known
+            best = int(np.argmax(fitness))
+            logging.info("Generation %d: best %s %.4f, median %.4f, %d new backtests, %d memo hits | %s",
+                         gen, FITNESS, fitness[best], np.median(fitness), n_new, len(pop) - n_new,
+                         dict(zip(PARAM_NAMES, pop[best].tolist())))
+            if gen < generations:
+                pop = next_generation(pop, fitness, rng)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    best_genome = max(memo, key=lambda g: np.nan_to_num(memo[g][FITNESS], nan=-np.inf))
+    return dict(zip(PARAM_NAMES, best_genome)), memo
+
+
+# === Main ===
+def setup_logging():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
+
+
+def main(data_path=DATA_PATH):
+    """Run the GA, save every evaluated genome ranked by fitness and return the best parameters."""
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    best, memo = run_ga(data_path)
+    table = memo_table(memo)
+    with stage("save"):
+        table.to_csv(RESULTS_OUT_CSV, index=False)
+    logging.info("%d genomes evaluated; results saved to %s", len(table), RESULTS_OUT_CSV)
+    logging.info("Top %d by %s:\n%s", TOP_N, FITNESS, table.head(TOP_N).to_string(index=False))
+    logging.info("Best parameters: %s", best)
+    return best
 
-# --- Genetic Algorithm Parameters ---
-POPULATION_SIZE = 20
-CHROMOSOME_LENGTH = 10
-GENERATIONS = 10
-MUTATION_RATE = 0.1
-
-# --- Fitness function ---
-def fitness(chromosome):
-    """Simple fitness: sum of genes"""
-    return sum(chromosome)
-
-# --- GA Operations ---
-def create_chromosome():
-    return [random.randint(0, 1) for _ in range(CHROMOSOME_LENGTH)]
-
-def create_population():
-    return [create_chromosome() for _ in range(POPULATION_SIZE)]
-
-def select_pair(population):
-    sorted_pop = sorted(population, key=fitness, reverse=True)
-    return sorted_pop[0], sorted_pop[1]
-
-def crossover(parent1, parent2):
-    point = random.randint(1, CHROMOSOME_LENGTH - 1)
-    child1 = parent1[:point] + parent2[point:]
-    child2 = parent2[:point] + parent1[point:]
-    return child1, child2
-
-def mutate(chromosome):
-    for i in range(len(chromosome)):
-        if random.random() < MUTATION_RATE:
-            chromosome[i] = 1 - chromosome[i]
-    return chromosome
-
-# --- Main GA Loop ---
-def main():
-    population = create_population()
-    logging.info(f"Initial population: {population}")
-
-    for gen in range(1, GENERATIONS + 1):
-        logging.info(f"--- Generation {gen} ---")
-        new_population = []
-
-        while len(new_population) < POPULATION_SIZE:
-            parent1, parent2 = select_pair(population)
-            child1, child2 = crossover(parent1, parent2)
-            child1 = mutate(child1)
-            child2 = mutate(child2)
-            new_population.extend([child1, child2])
-
-        population = new_population[:POPULATION_SIZE]
-        best = max(population, key=fitness)
-        logging.info(f"Best chromosome: {best}, Fitness: {fitness(best)}")
-
-    logging.info("Genetic algorithm simulation completed.")
 
 if __name__ == "__main__":
-    main()
+    setup_logging()
+    with run_summary("genetic_algorithm"):
+        main()
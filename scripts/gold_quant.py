@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+scripts/gold_quant.py
+
+Single entry point for the forecasting and backtesting scripts.
+- Subcommands: arima-garch, gbm, lstm-gru, transformer, backtest, and serve (forecast_service.py daemon).
+- Only the chosen subcommand's script is imported, so TensorFlow, statsmodels/arch or Backtrader
+  are loaded only by the subcommands that need them.
+- Runs headless: matplotlib uses the Agg backend and plots are written only with --plot FILE.
+- Every run writes a stage-timing / peak-RSS summary to logs/runs/ (instrument.py); --profile STAGE
+  additionally captures cProfile output for that stage.
+
+Usage: python scripts/gold_quant.py gbm --model garch --plot tmp/img_model_gbm_montecarlo.png
+"""
+
+import os
+import argparse
+import importlib
+
+from instrument import run_summary, PROFILE_ENV
+
+DATA_PATH = "dataset/xauusd_5m.csv"
+
+
+def _load(module_name: str):
+    """Import a script module and set up its logging."""
+    module = importlib.import_module(module_name)
+    module.setup_logging()
+    return module
+
+
+def run_arima_garch(args):
+    _load("model_arima_garch").main(data_path=args.data, plot_path=args.plot, show_plot=False)
+
+
+def run_gbm(args):
+    _load("model_gbm_montecarlo").main(data_path=args.data, model=args.model, plot_path=args.plot,
+                                       show_plot=False)
+
+
+def run_lstm_gru(args):
+    _load("model_lstm_gru").main(data_path=args.data, plot_path=args.plot, show_plot=False)
+
+
+def run_transformer(args):
+    _load("model_transformer").main(data_path=args.data, plot_path=args.plot, show_plot=False)
+
+
+def run_backtest(args):
+    if args.engine == "vector":
+        _load("vector_backtest").main(data_path=args.data)
+    else:
+        _load("backtest_strategy").main(data_path=args.data, plot_path=args.plot)
+
+
+def run_serve(args):
+    service = _load("forecast_service")
+    service.main(["--data", args.data, "--models", args.models, "--host", args.host, "--port", str(args.port)]
+                 + (["--socket", args.socket] if args.socket else []))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="gold_quant", description="XAUUSD forecasting and backtesting")
+    parser.add_argument("--profile", metavar="STAGES",
+                        help="comma-separated stages to cProfile, e.g. fit,forecast or strategy.next")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name, func, help_text):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--data", default=DATA_PATH, help="bar CSV or 1m partition directory")
+        p.add_argument("--plot", metavar="FILE", help="write the plot to FILE (default: no plot)")
+        p.set_defaults(func=func)
+        return p
+
+    add("arima-garch", run_arima_garch, "ARIMA+GARCH forecast")
+    gbm = add("gbm", run_gbm, "Monte Carlo forecast")
+    gbm.add_argument("--model", choices=("gbm", "garch", "jump"), default="gbm", help="path generator")
+    add("lstm-gru", run_lstm_gru, "LSTM+GRU forecast with MC Dropout")
+    add("transformer", run_transformer, "Transformer forecast with MC Dropout")
+    bt = add("backtest", run_backtest, "EMA/RSI/MACD strategy backtest")
+    bt.add_argument("--engine", choices=("backtrader", "vector"), default="backtrader",
+                    help="Backtrader (with plot) or the vectorized engine")
+    serve = sub.add_parser("serve", help="long-running forecast service (HTTP or Unix socket)")
+    serve.add_argument("--data", default=DATA_PATH)
+    serve.add_argument("--models", default="arima-garch,gbm,lstm-gru,transformer")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--socket", help="Unix socket path (overrides host/port)")
+    serve.set_defaults(func=run_serve)
+    return parser
+
+
+def main(argv=None):
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        os.environ[PROFILE_ENV] = args.profile
+    with run_summary(args.command.replace("-", "_")):
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
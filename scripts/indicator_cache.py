@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+scripts/indicator_cache.py
+
+Shared indicator cache for strategy runs and parameter sweeps.
+- Series are keyed by (indicator, source column, params, data fingerprint), so identical
+  EMAs/RSIs/MACDs are computed once per dataset however many combinations use them.
+- Keeps results in a bounded LRU (by bytes) in memory.
+- Optionally persists them as .npy under dataset/cache/indicators/ and reloads them
+  memory-mapped, so sweep workers and later runs share one copy through the page cache.
+"""
+
+import os
+import hashlib
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+# === Configurations ===
+INDICATOR_CACHE_DIR = os.path.join("dataset", "cache", "indicators")
+MAX_CACHE_BYTES = 512 * 1024 ** 2  # in-memory LRU budget per process
+
+
+def data_fingerprint(values: np.ndarray) -> str:
+    """Content hash of a numeric array (length and bytes)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(values)).encode())
+    h.update(np.ascontiguousarray(values).data)
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """Bounded LRU of indicator series with optional on-disk persistence."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.items = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(name: str, source: str, params: tuple, fingerprint: str) -> tuple:
+        return (name, source, tuple(params), fingerprint)
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.blake2b(repr(key[:3]).encode(), digest_size=12).hexdigest()
+        return os.path.join(self.cache_dir, key[3], f"{key[0]}_{digest}.npy")
+
+    def _remember(self, key: tuple, values: np.ndarray) -> None:
+        self.items[key] = values
+        self.nbytes += values.nbytes
+        while self.nbytes > self.max_bytes and len(self.items) > 1:
+            _, old = self.items.popitem(last=False)
+            self.nbytes -= old.nbytes
+
+    def get(self, name: str, params: tuple, fingerprint: str, compute, source: str = "Close") -> np.ndarray:
+        """Return the cached series for the key, calling compute() only on a miss."""
+        key = self.make_key(name, source, params, fingerprint)
+        values = self.items.get(key)
+        if values is not None:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return values
+
+        path = self._path(key) if self.cache_dir else None
+        if path and os.path.exists(path):
+            values = np.load(path, mmap_mode="r")
+            self.hits += 1
+        else:
+            values = np.asarray(compute())
+            self.misses += 1
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+                np.save(tmp_path, values)
+                os.replace(tmp_path, path)
+        self._remember(key, values)
+        return values
+
+    def clear(self) -> None:
+        self.items.clear()
+        self.nbytes = 0
+
+    def log_stats(self) -> None:
+        logging.info("Indicator cache: %d hits, %d misses, %d series (%.1f MB) in memory",
+                     self.hits, self.misses, len(self.items), self.nbytes / 1024 ** 2)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+scripts/instrument.py
+
+Lightweight run instrumentation shared by the scripts.
+- stage("fit") context manager and @timed("fit") decorator: call count, total/mean/max wall time and
+  the peak RSS sampled while the stage was active.
+- count("bars", n): named counters.
+- A background thread samples RSS every RSS_INTERVAL seconds (/proc/self/statm, getrusage fallback).
+- Thread-safe: stage bookkeeping and counters are updated under the run's lock, so @timed functions may
+  run concurrently (e.g. on the forecast service's thread pool).
+- run_summary("model_arima_garch") wraps a whole run and writes a JSON summary of stages, counters and
+  memory to logs/runs/<name>_<timestamp>.json, also when the run fails.
+- Opt-in profiling without editing scripts: GOLD_QUANT_PROFILE=<stage>[,<stage>...] captures cProfile
+  for those stages (accumulated over calls), dumps <run>_<stage>.prof next to the summary and logs
+  the top functions by cumulative time.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import resource
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+# === Configurations ===
+RUN_DIR = os.path.join("logs", "runs")
+RSS_INTERVAL = 0.05                 # seconds between RSS samples
+PROFILE_ENV = "GOLD_QUANT_PROFILE"  # comma-separated stage names to profile
+PROFILE_TOP = 25                    # functions listed in the log per profiled stage
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageStats:
+    __slots__ = ("calls", "total", "max", "rss_peak")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rss_peak = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_s": self.total,
+            "mean_s": self.total / self.calls if self.calls else 0.0,
+            "max_s": self.max,
+            "rss_peak_mb": self.rss_peak / 2**20,
+        }
+
+
+class RunStats:
+    """Stage timings, counters and RSS samples of one run."""
+
+    def __init__(self, name: str = "run"):
+        self.name = name
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.active = {}            # stage name -> nesting depth, read by the RSS sampler
+        self.rss_peak = current_rss()
+        self.profiles = {}
+        self.profile_stages = set(filter(None, os.environ.get(PROFILE_ENV, "").split(",")))
+        self._profiling = False
+        self.lock = threading.Lock()    # guards stages, counters, active and _profiling
+
+    def sample_rss(self):
+        rss = current_rss()
+        with self.lock:
+            self.rss_peak = max(self.rss_peak, rss)
+            for name in self.active:
+                stats = self.stages[name]
+                if rss > stats.rss_peak:
+                    stats.rss_peak = rss
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "name": self.name,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "wall_s": time.time() - self.started,
+                "rss_peak_mb": max(self.rss_peak, peak_rss()) / 2**20,
+                "stages": {name: s.as_dict() for name, s in self.stages.items()},
+                "counters": dict(self.counters),
+                "profiled": sorted(self.profiles),
+            }
+
+
+RUN = RunStats()
+
+
+# === Stages and counters ===
+@contextmanager
+def stage(name: str):
+    """Time a block as stage `name` of the current run (cProfile'd if listed in GOLD_QUANT_PROFILE)."""
+    run = RUN
+    with run.lock:
+        stats = run.stages.get(name)
+        if stats is None:
+            stats = run.stages[name] = StageStats()
+        run.active[name] = run.active.get(name, 0) + 1
+        profiler = None
+        if name in run.profile_stages and not run._profiling:
+            profiler = run.profiles.setdefault(name, cProfile.Profile())
+            run._profiling = True
+    if profiler is not None:
+        profiler.enable()
+    t0 = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        elapsed = time.perf_counter() - t0
+        if profiler is not None:
+            profiler.disable()
+        with run.lock:
+            if profiler is not None:
+                run._profiling = False
+            stats.calls += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if stats.calls == 1:    # stages shorter than RSS_INTERVAL still get one reading
+                stats.rss_peak = max(stats.rss_peak, current_rss())
+            depth = run.active[name] - 1
+            if depth:
+                run.active[name] = depth
+            else:
+                del run.active[name]
+
+
+def timed(name: str = None):
+    """Decorator form of stage(); the stage name defaults to the function's qualified name."""
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to counter `name` of the current run."""
+    run = RUN
+    with run.lock:
+        run.counters[name] = run.counters.get(name, 0) + n
+
+
+# === Runs ===
+def _sample_loop(run: RunStats, stop: threading.Event, interval: float):
+    while not stop.wait(interval):
+        run.sample_rss()
+
+
+def _dump_profiles(run: RunStats, base_path: str):
+    for name, profiler in run.profiles.items():
+        path = f"{base_path}_{name.replace('/', '_')}.prof"
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        logging.info("Profile of stage %s saved to %s:\n%s", name, path, out.getvalue())
+
+
+@contextmanager
+def run_summary(name: str, run_dir: str = RUN_DIR, interval: float = RSS_INTERVAL):
+    """
+    Start a fresh run named `name`, sample RSS in the background, and on exit write the JSON summary
+    (stages, counters, peak RSS, status) plus any requested profiles. Yields the RunStats.
+    """
+    global RUN
+    previous, RUN = RUN, RunStats(name)
+    run = RUN
+    stop = threading.Event()
+    sampler = threading.Thread(target=_sample_loop, args=(run, stop, interval), daemon=True)
+    sampler.start()
+    status = "ok"
+    try:
+        yield run
+    except BaseException as e:
+        status = f"error: {type(e).__name__}: {e}"
+        raise
+    finally:
+        stop.set()
+        sampler.join()
+        run.sample_rss()
+        os.makedirs(run_dir, exist_ok=True)
+        base_path = os.path.join(run_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(run.started))}")
+        summary = dict(run.as_dict(), status=status)
+        with open(base_path + ".json", "w") as f:
+            json.dump(summary, f, indent=2)
+        _dump_profiles(run, base_path)
+        slowest = sorted(run.stages.items(), key=lambda kv: -kv[1].total)[:5]
+        logging.info("Run summary saved to %s.json (%.2fs, peak RSS %.0f MB; %s)", base_path, summary["wall_s"],
+                     summary["rss_peak_mb"], ", ".join(f"{k} {v.total:.2f}s" for k, v in slowest) or "no stages")
+        RUN = previous
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+scripts/mc_dropout.py
+
+Batched Monte Carlo Dropout forecasting shared by the LSTM+GRU and Transformer scripts.
+- All simulations are stacked in the batch dimension, so each autoregressive step is one
+  forward pass (with dropout active) over every simulation.
+- The step is a compiled tf.function with a fixed input signature (traced once per model).
+- Windows are slices of a preallocated float32 buffer of shape (n_sim, lookback + n_steps):
+  each prediction is written after the window, which then advances by one column (no np.roll).
+"""
+
+import numpy as np
+import tensorflow as tf
+
+
+def make_mc_step(model, lookback: int):
+    """Compiled forward pass with dropout on: (batch, lookback, 1) -> (batch, 1)."""
+    @tf.function(input_signature=[tf.TensorSpec([None, lookback, 1], tf.float32)])
+    def step(windows):
+        return model(windows, training=True)
+    return step
+
+
+def mc_dropout_paths(model, last_window, n_steps: int, n_sim: int, step_fn=None) -> np.ndarray:
+    """
+    Autoregressive MC Dropout forecasts from last_window (shape (1, lookback, 1), scaled).
+    Returns (n_sim, n_steps) scaled predictions. step_fn from make_mc_step can be reused across calls.
+    """
+    lookback = last_window.shape[1]
+    step_fn = step_fn or make_mc_step(model, lookback)
+    buffer = np.empty((n_sim, lookback + n_steps), dtype=np.float32)
+    buffer[:, :lookback] = np.asarray(last_window, dtype=np.float32).reshape(1, lookback)
+    for t in range(n_steps):
+        windows = buffer[:, t:t + lookback, None]
+        buffer[:, lookback + t] = step_fn(tf.constant(windows)).numpy()[:, 0]
+    return buffer[:, lookback:].astype(float)
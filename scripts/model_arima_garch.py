@@ -4,24 +4,37 @@ scripts/model_arima_garch.py
 
 ARIMA + GARCH pipeline for short-term price forecasting (XAUUSD 5m).
 - Use last 100k records for modeling by default.
-- Grid search ARIMA (sequential, light) by AIC.
+- Grid search ARIMA by AIC over a process pool (per-order timeout, optional AIC-based pruning).
 - Fit GARCH(1,1) on ARIMA residuals.
 - Forecast next N steps (default 50) and compute 95% CI using GARCH variance forecasts.
 - Save forecast CSV to tmp/forecast_arima_garch.csv and logs to logs/model_arima_garch.txt.
+- Persist the chosen order, fitted parameters and end-of-window filter state to tmp/arima_garch_state.json
+  (residual window in tmp/arima_garch_resid.npy); later runs filter only the new bars from that state
+  and warm-start GARCH instead of searching again. A full grid search
+  runs only every FULL_SEARCH_INTERVAL of data time or when the new bars' likelihood signals drift.
 """
 
 import os
+import json
+import time
+import signal
 import logging
+import threading
+import multiprocessing as mp
 from itertools import product
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import warnings
 
 from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.statespace.initialization import Initialization
 from arch import arch_model
 
+from bar_store import load_bars
+from plotting import plot_forecast
+from instrument import stage, timed, run_summary
+
 warnings.filterwarnings("ignore")
 
 # === Configurations ===
@@ -32,6 +45,8 @@ LOG_FILE = os.path.join(LOG_DIR, "model_arima_garch.txt")
 TMP_DIR = "tmp"
 os.makedirs(TMP_DIR, exist_ok=True)
 FORECAST_OUT_CSV = os.path.join(TMP_DIR, "forecast_arima_garch.csv")
+STATE_PATH = os.path.join(TMP_DIR, "arima_garch_state.json")
+RESID_PATH = os.path.join(TMP_DIR, "arima_garch_resid.npy")  # ARIMA residual window, for the GARCH refit
 
 DATA_PATH = "dataset/xauusd_5m.csv"
 SUBSAMPLE_SIZE = 100_000  # use last 100k rows for model selection/training
@@ -44,82 +59,186 @@ GARCH_P = 1
 GARCH_Q = 1
 CONF_LEVEL = 0.95        # confidence interval level
 REFIT_ON_FULL = False    # if True, refit final models on full series (may be expensive)
+ARIMA_WORKERS = os.cpu_count()  # processes for the order search (1 = fit in-process)
+ARIMA_ORDER_TIMEOUT = 600       # seconds per order before it is abandoned (0 = no limit)
+ARIMA_PRUNE_THRESHOLD = None    # stop growing p+q for a given d once AIC improves by less than this (None = full grid)
+INCREMENTAL = True              # update the saved model state instead of re-running the grid search
+WARM_REFIT_ARIMA = False        # if True, re-optimise ARIMA on the window from the saved params; else filter new bars only
+FULL_SEARCH_INTERVAL = pd.Timedelta(days=7)  # data time between scheduled full grid searches
+DRIFT_MIN_BARS = 50             # new bars needed before testing for drift
+DRIFT_Z = 3.0                   # drift if new bars' mean log-likelihood is this many std errors below baseline
+
 
 # === Logging ===
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, mode="w")
-    ]
-)
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
 
 
 # === Utilities ===
-def load_price_csv(path: str) -> pd.DataFrame:
+@timed("load")
+def load_price_csv(path: str, tail=None) -> pd.DataFrame:
     """
     Load CSV with columns: Date,Time,Open,High,Low,Close,Volume
     Date format expected: YYYY.MM.DD
     Time format expected: HH:MM
+    Parsed once into the memory-mapped bar store (see bar_store.py), reopened from cache afterwards.
+    If tail is given, only the last `tail` rows are decoded.
     """
-    df = pd.read_csv(path)
-    df["datetime"] = pd.to_datetime(df["Date"] + " " + df["Time"], format="%Y.%m.%d %H:%M")
-    df = df.set_index("datetime")
-    df["Close"] = df["Close"].astype(float)
-    return df
+    return load_bars(path, tail=tail)
 
 
+@timed("preprocess")
 def prepare_log_returns(price_series: pd.Series) -> pd.Series:
     """Compute log returns and drop NaNs."""
     return np.log(price_series).diff().dropna()
 
 
-def arima_grid_search(series: pd.Series, p_range, d_range, q_range):
+# per-worker state for the order search, set by _init_search_worker
+_search_series = None
+_search_timeout = None
+
+
+def _init_search_worker(series, timeout):
+    global _search_series, _search_timeout
+    _search_series = series
+    _search_timeout = timeout
+
+
+class _OrderTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _OrderTimeout()
+
+
+def _fit_order(order):
+    """
+    Fit one ARIMA order in a worker. Returns (order, aic, params) or (order, None, error message).
+    The timeout is enforced with a SIGALRM interval timer where available (main thread only), so a
+    stuck fit frees its worker; the previous handler and any pending timer are restored afterwards.
+    """
+    use_alarm = (bool(_search_timeout) and hasattr(signal, "setitimer")
+                 and threading.current_thread() is threading.main_thread())
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        previous_timer = signal.setitimer(signal.ITIMER_REAL, _search_timeout)
+        armed_at = time.monotonic()
+    try:
+        res = ARIMA(_search_series, order=order).fit(method_kwargs={"warn_convergence": False})
+        return order, float(res.aic), np.asarray(res.params)
+    except _OrderTimeout:
+        return order, None, f"timed out after {_search_timeout}s"
+    except Exception as e:
+        return order, None, str(e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+            delay, interval = previous_timer
+            if delay:
+                signal.setitimer(signal.ITIMER_REAL, max(delay - (time.monotonic() - armed_at), 1e-6), interval)
+
+
+def _order_waves(orders, prune):
     """
-    Sequential grid search for ARIMA by AIC.
+    Group orders into waves of equal p+q (all d together) when pruning, so each wave
+    holds the nested extensions of the previous one. Without pruning, a single wave.
+    """
+    if not prune:
+        return [orders]
+    sizes = sorted({p + q for p, _, q in orders})
+    return [[o for o in orders if o[0] + o[2] == k] for k in sizes]
+
+
+@timed("fit.arima_search")
+def arima_grid_search(series: pd.Series, p_range, d_range, q_range, n_workers=None, timeout=None,
+                      prune_threshold=None):
+    """
+    Parallel grid search for ARIMA by AIC.
+    Orders are fitted over a process pool (n_workers, default ARIMA_WORKERS) with a per-order timeout
+    in seconds (default ARIMA_ORDER_TIMEOUT; fractions allowed, 0 disables it).
+    With prune_threshold, orders are searched in waves of increasing p+q and a differencing order d
+    stops growing once the best AIC of a wave improves on the previous waves by less than the threshold.
+    Ties are broken by grid order, matching a sequential search.
     Returns best_order and fitted ARIMA results object.
     """
-    best_aic = np.inf
-    best_order = None
-    best_res = None
+    n_workers = ARIMA_WORKERS if n_workers is None else n_workers
+    timeout = ARIMA_ORDER_TIMEOUT if timeout is None else timeout
+    prune_threshold = ARIMA_PRUNE_THRESHOLD if prune_threshold is None else prune_threshold
 
     orders = list(product(range(p_range[0], p_range[1] + 1),
                           range(d_range[0], d_range[1] + 1),
                           range(q_range[0], q_range[1] + 1)))
-
-    logging.info("Starting sequential ARIMA grid search over %d orders.", len(orders))
-
-    for order in orders:
-        try:
-            # Fit ARIMA on pandas Series
-            model = ARIMA(series, order=order)
-            res = model.fit(method_kwargs={"warn_convergence": False})
-            aic = float(res.aic)
-            logging.info("ARIMA%s fitted, AIC=%.4f", order, aic)
-            if aic < best_aic:
-                best_aic = aic
-                best_order = order
-                best_res = res
-        except Exception as e:
-            logging.debug("ARIMA%s failed: %s", order, e)
-            continue
-
-    if best_order is None:
+    rank = {order: i for i, order in enumerate(orders)}
+    waves = _order_waves(orders, prune_threshold is not None)
+    logging.info("Starting ARIMA grid search over %d orders with %d workers%s.", len(orders), n_workers,
+                 f" (pruning below AIC gain {prune_threshold})" if prune_threshold is not None else "")
+
+    fitted = {}            # order -> (aic, params)
+    best_by_d = {}         # d -> best AIC so far
+    active_d = set(range(d_range[0], d_range[1] + 1))
+    pool = mp.Pool(n_workers, initializer=_init_search_worker, initargs=(series, timeout)) if n_workers > 1 else None
+    if pool is None:
+        _init_search_worker(series, timeout)
+    try:
+        for wave in waves:
+            wave = [o for o in wave if o[1] in active_d]
+            if not wave:
+                break
+            results = pool.imap_unordered(_fit_order, wave) if pool else map(_fit_order, wave)
+            wave_best = {}
+            for order, aic, params in results:
+                if aic is None:
+                    logging.debug("ARIMA%s failed: %s", order, params)
+                    continue
+                logging.info("ARIMA%s fitted, AIC=%.4f", order, aic)
+                fitted[order] = (aic, params)
+                wave_best[order[1]] = min(aic, wave_best.get(order[1], np.inf))
+            if prune_threshold is None:
+                continue
+            for d in list(active_d):
+                prev = best_by_d.get(d, np.inf)
+                cur = wave_best.get(d, np.inf)
+                if np.isfinite(prev) and prev - cur < prune_threshold:
+                    logging.info("Pruning d=%d: AIC gain %.4f below threshold after p+q=%d.",
+                                 d, prev - cur, wave[0][0] + wave[0][2])
+                    active_d.discard(d)
+                best_by_d[d] = min(prev, cur)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    if not fitted:
         raise RuntimeError("ARIMA grid search failed for all orders.")
 
+    best_order = min(fitted, key=lambda o: (fitted[o][0], rank[o]))
+    best_aic, best_params = fitted[best_order]
+    # rebuild the results object from the winning parameters (Kalman filter only, no optimisation)
+    best_res = ARIMA(series, order=best_order).filter(best_params)
+
     logging.info("ARIMA grid search completed. Best order: %s, Best AIC: %.4f", best_order, best_aic)
     return best_order, best_res
 
 
-def fit_garch_on_residuals(residuals: pd.Series, p=1, q=1):
+@timed("fit.garch")
+def fit_garch_on_residuals(residuals: pd.Series, p=1, q=1, starting_values=None):
     """
     Fit a GARCH(p,q) on residuals. Returns fitted arch model.
+    starting_values (e.g. previously fitted params) warm-starts the optimiser.
     If fit fails, raise exception for caller to handle.
     """
     try:
         am = arch_model(residuals * 1.0, vol="GARCH", p=p, q=q, dist="normal", mean="Zero")
-        res = am.fit(disp="off", show_warning=False)
+        res = am.fit(disp="off", show_warning=False, starting_values=starting_values)
         logging.info("GARCH(%d,%d) fitted. AIC: %.4f", p, q, res.aic)
         return res
     except Exception as e:
@@ -127,6 +246,138 @@ def fit_garch_on_residuals(residuals: pd.Series, p=1, q=1):
         raise
 
 
+# === Persistent model state ===
+def state_key(data_path: str) -> dict:
+    """What a saved state was fitted on: data source, modelling window and GARCH order."""
+    return {
+        "data": os.path.abspath(data_path),
+        "subsample_size": SUBSAMPLE_SIZE,
+        "garch_order": [GARCH_P, GARCH_Q],
+    }
+
+
+def load_model_state(path: str, key=None):
+    """
+    Return the saved model state dict, or None if missing/unreadable.
+    With key (see state_key), a state saved for other data or settings is also treated as missing.
+    """
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if key is not None and state.get("key") != key:
+        logging.info("Saved model state in %s was fitted on %s, not %s; ignoring it.",
+                     path, state.get("key"), key)
+        return None
+    return state
+
+
+def load_residuals(path: str):
+    """Saved ARIMA residual window, or None if missing/unreadable."""
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        return None
+
+
+@timed("save.state")
+def save_model_state(path: str, key, order, arima_res, garch_res, resid, last_timestamp, searched_through,
+                     llf_baseline, resid_path=RESID_PATH):
+    """
+    Save order, fitted parameters, drift baseline and the Kalman filter state at the last bar so the next
+    run can update instead of refit; the residual window goes to resid_path.
+    """
+    filter_res = arima_res.filter_results
+    state = {
+        "key": key,
+        "order": list(order),
+        "arima_params": np.asarray(arima_res.params, dtype=float).tolist(),
+        # predicted state and covariance for the last bar, and that bar's return (see update_arima)
+        "filter_state": filter_res.predicted_state[:, -2].tolist(),
+        "filter_state_cov": filter_res.predicted_state_cov[:, :, -2].tolist(),
+        "last_return": float(arima_res.model.endog[-1, 0]),
+        "garch_params": (np.asarray(garch_res.params, dtype=float).tolist()
+                         if hasattr(garch_res, "params") else None),
+        "last_timestamp": str(last_timestamp),
+        "searched_through": str(searched_through),
+        "llf_baseline": llf_baseline,
+    }
+    with open(resid_path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(resid, dtype=float)[-SUBSAMPLE_SIZE:])
+    os.replace(resid_path + ".tmp", resid_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+    logging.info("Model state saved to %s", path)
+
+
+def search_due(state, last_timestamp) -> bool:
+    """True if the scheduled full grid search is due (in data time)."""
+    return pd.Timestamp(last_timestamp) - pd.Timestamp(state["searched_through"]) >= FULL_SEARCH_INTERVAL
+
+
+def loglik_baseline(arima_res) -> dict:
+    """Mean and std of per-observation log-likelihood, the reference for drift detection."""
+    llf_obs = np.asarray(arima_res.llf_obs)
+    return {"mean": float(llf_obs.mean()), "std": float(llf_obs.std())}
+
+
+@timed("fit.arima_update")
+def update_arima(series: pd.Series, n_new: int, state, resid):
+    """
+    Bring the saved ARIMA up to date on the current window. By default the Kalman filter restarts from
+    the state saved at the last fitted bar and runs over that bar plus the n_new new ones (what
+    ARIMAResults.extend does in-process), so the cost grows with n_new rather than SUBSAMPLE_SIZE, and
+    the saved residual window is extended with the new residuals. With WARM_REFIT_ARIMA the whole
+    window is re-optimised from the saved parameters.
+    Returns (ARIMA results, residual window for the GARCH fit).
+    """
+    order = tuple(state["order"])
+    params = np.asarray(state["arima_params"])
+    if WARM_REFIT_ARIMA:
+        res = ARIMA(series, order=order).fit(start_params=params, method_kwargs={"warn_convergence": False})
+        return res, res.resid
+    endog = np.r_[state["last_return"], np.asarray(series, dtype=float)[len(series) - n_new:]]
+    model = ARIMA(endog, order=order)
+    model.ssm.initialization = Initialization(model.k_states, "known",
+                                              constant=np.asarray(state["filter_state"]),
+                                              stationary_cov=np.asarray(state["filter_state_cov"]))
+    res = model.filter(params)
+    return res, np.r_[resid, res.resid[1:]][-len(series):]
+
+
+def detect_drift(arima_res, n_new: int, state) -> bool:
+    """
+    Compare the mean log-likelihood of the newest n_new bars with the baseline saved at search time.
+    Returns True if it is more than DRIFT_Z standard errors lower.
+    """
+    if n_new < DRIFT_MIN_BARS:
+        return False
+    recent = np.asarray(arima_res.llf_obs)[-n_new:]
+    base = state["llf_baseline"]
+    z = (recent.mean() - base["mean"]) / (base["std"] / np.sqrt(n_new))
+    logging.info("Drift check on %d new bars: z=%.2f", n_new, z)
+    return z < -DRIFT_Z
+
+
+def reconstruct_prices(last_price, mean_returns, variances, z_value):
+    """
+    Map log-return forecasts to prices. The mean path compounds exp(mu) step by step, and each
+    step's band is the previous mean price times exp(mu +- z * sigma).
+    Works on 1D (steps,) inputs or 2D (origins, steps) inputs with one last price per origin.
+    Returns (price_mean, price_lower, price_upper).
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    sigma = np.sqrt(np.maximum(np.asarray(variances, dtype=float), 0.0))
+    last = np.asarray(last_price, dtype=float)[..., None] if mu.ndim > 1 else float(last_price)
+    cum = np.cumsum(mu, axis=-1)
+    price_mean = last * np.exp(cum)
+    prev_mean = last * np.exp(cum - mu)
+    return price_mean, prev_mean * np.exp(mu - z_value * sigma), prev_mean * np.exp(mu + z_value * sigma)
+
+
+@timed("forecast")
 def forecast_arima_garch(arima_res, garch_res, steps, last_price):
     """
     Produce ARIMA mean forecasts (returns) and GARCH variance forecasts, then reconstruct price forecast.
@@ -155,31 +406,9 @@ def forecast_arima_garch(arima_res, garch_res, steps, last_price):
         # fallback to 1.96 for 95%
         z_value = 1.96
 
-    # Reconstruct prices iteratively
-    prices_mean = []
-    prices_lower = []
-    prices_upper = []
-    current_price = float(last_price)
-
-    for i in range(steps):
-        mu = float(mean_forecast.iloc[i]) if hasattr(mean_forecast, "iloc") else float(mean_forecast[i])
-        sigma2 = float(var_fore[i])
-        sigma = np.sqrt(max(sigma2, 0.0))
-
-        # predicted multiplicative factor for one-step: exp(mu)
-        price_next_mean = current_price * np.exp(mu)
-        # compute CI on return scale and then map to price
-        upper_return = mu + z_value * sigma
-        lower_return = mu - z_value * sigma
-        price_next_upper = current_price * np.exp(upper_return)
-        price_next_lower = current_price * np.exp(lower_return)
-
-        prices_mean.append(price_next_mean)
-        prices_upper.append(price_next_upper)
-        prices_lower.append(price_next_lower)
-
-        # advance current_price for next step using mean forecast (this produces a single path)
-        current_price = price_next_mean
+    # Reconstruct prices: mean path compounds exp(mu); CI applies +-z*sigma to the previous mean price
+    prices_mean, prices_lower, prices_upper = reconstruct_prices(
+        last_price, np.asarray(mean_forecast, dtype=float)[:steps], np.asarray(var_fore, dtype=float)[:steps], z_value)
 
     df_out = pd.DataFrame({
         "step": np.arange(1, steps + 1),
@@ -201,40 +430,69 @@ except Exception:
 
 
 # === Main flow ===
-if __name__ == "__main__":
-    logging.info("Loading data from %s", DATA_PATH)
-    df = load_price_csv(DATA_PATH)
-    logging.info("Loaded price series with %d rows", len(df))
-
-    # Subsample last N rows for modeling
-    if SUBSAMPLE_SIZE is not None and len(df) > SUBSAMPLE_SIZE:
-        df_used = df.tail(SUBSAMPLE_SIZE).copy()
-        logging.info("Using last %d rows for modeling.", SUBSAMPLE_SIZE)
-    else:
-        df_used = df.copy()
-        logging.info("Using full data for modeling (size %d).", len(df_used))
+def main(data_path=DATA_PATH, plot_path=None, show_plot=True):
+    """Fit or update the models, forecast and save the CSV; plot only if plot_path or show_plot."""
+    logging.info("Loading data from %s", data_path)
+    # Decode only the last SUBSAMPLE_SIZE rows for modeling
+    df_used = load_price_csv(data_path, tail=SUBSAMPLE_SIZE)
+    logging.info("Using last %d rows for modeling.", len(df_used))
 
     # Prepare log returns
     log_ret = prepare_log_returns(df_used["Close"])
     logging.info("Prepared log returns, length %d", len(log_ret))
 
-    # Grid search ARIMA on log returns (sequential)
-    best_order, best_arima_res = arima_grid_search(log_ret, ARIMA_P_RANGE, ARIMA_D_RANGE, ARIMA_Q_RANGE)
+    # Update the saved model state when possible, otherwise run the full grid search
+    last_timestamp = df_used.index[-1]
+    key = state_key(data_path)
+    state = load_model_state(STATE_PATH, key) if INCREMENTAL else None
+    if state is not None and pd.Timestamp(state["last_timestamp"]) not in log_ret.index:
+        logging.info("Saved state ends at %s, outside the current window; ignoring it.", state["last_timestamp"])
+        state = None
+    if state is not None and search_due(state, last_timestamp):
+        logging.info("Scheduled full grid search is due (last search through %s).", state["searched_through"])
+        state = None
+    garch_start = None
+    resid = load_residuals(RESID_PATH) if state is not None else None
+    if state is not None and (resid is None or "filter_state" not in state):
+        logging.info("Saved state has no filter state or residual window; running full grid search.")
+        state = None
+    if state is not None:
+        best_order = tuple(state["order"])
+        n_new = int((log_ret.index > pd.Timestamp(state["last_timestamp"])).sum())
+        logging.info("Updating saved ARIMA%s with %d new bars.", best_order, n_new)
+        best_arima_res, resid = update_arima(log_ret, n_new, state, resid)
+        if detect_drift(best_arima_res, n_new, state):
+            logging.warning("Drift detected on new bars, running full grid search.")
+            state = None
+        else:
+            garch_start = state["garch_params"]
+            searched_through = state["searched_through"]
+            llf_baseline = state["llf_baseline"]
+
+    if state is None:
+        # Grid search ARIMA on log returns (parallel)
+        best_order, best_arima_res = arima_grid_search(log_ret, ARIMA_P_RANGE, ARIMA_D_RANGE, ARIMA_Q_RANGE)
+        searched_through = last_timestamp
+        llf_baseline = loglik_baseline(best_arima_res)
+        resid = best_arima_res.resid
 
     # Optionally refit on full series if requested
-    if REFIT_ON_FULL:
+    if REFIT_ON_FULL and state is None:
         logging.info("Refitting ARIMA%s on full log-return series.", best_order)
+        df = load_price_csv(data_path)
         full_log_ret = prepare_log_returns(df["Close"])
-        best_arima_res = ARIMA(full_log_ret, order=best_order).fit(method_kwargs={"warn_convergence": False})
-        model_series_for_garch = best_arima_res.resid
+        with stage("fit.arima_full"):
+            best_arima_res = ARIMA(full_log_ret, order=best_order).fit(method_kwargs={"warn_convergence": False})
+        model_series_for_garch = resid = best_arima_res.resid
         last_close_price = df["Close"].iloc[-1]
     else:
-        model_series_for_garch = best_arima_res.resid
+        model_series_for_garch = resid
         last_close_price = df_used["Close"].iloc[-1]
 
     # Fit GARCH(1,1) on ARIMA residuals
     try:
-        garch_res = fit_garch_on_residuals(model_series_for_garch, p=GARCH_P, q=GARCH_Q)
+        garch_res = fit_garch_on_residuals(model_series_for_garch, p=GARCH_P, q=GARCH_Q,
+                                           starting_values=garch_start)
     except Exception:
         # If GARCH fails, fall back to using residual variance (constant volatility)
         logging.warning("GARCH fit failed, using constant variance fallback.")
@@ -249,6 +507,10 @@ if __name__ == "__main__":
                 return VF(np.repeat(var, horizon))
         garch_res = DummyGarch(model_series_for_garch)
 
+    if INCREMENTAL:
+        save_model_state(STATE_PATH, key, best_order, best_arima_res, garch_res, resid, last_timestamp,
+                         searched_through, llf_baseline)
+
     # Forecast next steps and reconstruct price path with CI
     logging.info("Forecasting next %d steps.", FORECAST_STEPS)
     forecast_df = forecast_arima_garch(best_arima_res, garch_res, steps=FORECAST_STEPS, last_price=last_close_price)
@@ -260,28 +522,22 @@ if __name__ == "__main__":
 
     # Save forecast to CSV
     forecast_df_out = forecast_df[["price_mean", "price_lower", "price_upper", "mean_return", "var"]].copy()
-    forecast_df_out.to_csv(FORECAST_OUT_CSV, index=True)
+    with stage("save"):
+        forecast_df_out.to_csv(FORECAST_OUT_CSV, index=True)
     logging.info("Forecast saved to %s", FORECAST_OUT_CSV)
 
     # Plot last HISTORY_WINDOW bars plus forecast mean and CI
-    try:
-        plot_tail = df_used["Close"].tail(HISTORY_WINDOW)
-        plt.figure(figsize=(12, 6))
-        plt.plot(plot_tail.index, plot_tail.values, label=f"Historical (last {HISTORY_WINDOW})")
-        plt.plot(forecast_df_out.index, forecast_df_out["price_mean"].values, label="Forecast mean")
-        plt.fill_between(forecast_df_out.index,
-                         forecast_df_out["price_lower"].values,
-                         forecast_df_out["price_upper"].values,
-                         color="gray", alpha=0.3, label=f"{int(CONF_LEVEL*100)}% CI")
-        plt.xlabel("Time")
-        plt.ylabel("Price")
-        plt.title("XAUUSD 5m ARIMA+GARCH Forecast (mean and CI)")
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
-    except Exception as e:
-        logging.warning("Plotting failed: %s", e)
+    plot_forecast(df_used["Close"].tail(HISTORY_WINDOW), forecast_df_out.index,
+                  forecast_df_out["price_mean"].values, forecast_df_out["price_lower"].values,
+                  forecast_df_out["price_upper"].values, CONF_LEVEL,
+                  "XAUUSD 5m ARIMA+GARCH Forecast (mean and CI)", out_path=plot_path, show=show_plot)
 
     logging.info("Script finished. Best ARIMA order: %s", best_order)
     logging.info("First forecasted mean prices:\n%s", forecast_df_out["price_mean"].head(10).to_string(index=True))
+    return forecast_df_out
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("model_arima_garch"):
+        main()
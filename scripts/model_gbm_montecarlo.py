@@ -6,17 +6,31 @@ Monte Carlo simulation using Geometric Brownian Motion (GBM) for XAUUSD 5m.
 - Use last 100k records for estimation.
 - Simulate N_MC paths and compute mean and confidence intervals.
 - Forecast next FORECAST_STEPS bars (default 50).
-- Save forecast CSV to tmp/forecast_gbm_mc.csv and logs to logs/model_gbm_mc.txt.
+- Save forecast CSV to tmp/forecast_<MODEL>_mc.csv (forecast_gbm_mc.csv by default) and logs to logs/model_gbm_mc.txt.
+- Paths are built from one block of shocks with a cumulative sum of log increments, using
+  numpy.random.Generator streams spawned from SEED.
+- Large path counts are simulated in chunks of CHUNK_PATHS; mean and CI bands come from running sums
+  and mergeable histogram quantile sketches, so memory stays flat in N_MC.
+- Chunks are sharded over MC_WORKERS processes, each with its own SeedSequence-spawned stream;
+  per-chunk sums and sketches are merged in chunk order, so output is bit-identical for a given SEED.
+- MODEL selects the path generator: "gbm" (constant mu/sigma), "garch" (GARCH(1,1) variance recursion,
+  parameters from model_arima_garch.fit_garch_on_residuals) or "jump" (Merton jump-diffusion).
+  Each generator advances all paths of a chunk with one array operation per step.
 """
 
 import os
 import logging
+import multiprocessing as mp
+from functools import partial
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import timedelta
 
+from bar_store import load_bars
+from plotting import plot_forecast
+from instrument import stage, timed, count, run_summary
+
 # === Configurations ===
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -24,7 +38,7 @@ LOG_FILE = os.path.join(LOG_DIR, "model_gbm_mc.txt")
 
 TMP_DIR = "tmp"
 os.makedirs(TMP_DIR, exist_ok=True)
-FORECAST_OUT_CSV = os.path.join(TMP_DIR, "forecast_gbm_mc.csv")
+FORECAST_OUT_CSV = os.path.join(TMP_DIR, "forecast_{model}_mc.csv")
 
 DATA_PATH = "dataset/xauusd_5m.csv"
 SUBSAMPLE_SIZE = 100_000  # use last 100k rows for estimation
@@ -32,66 +46,299 @@ FORECAST_STEPS = 50
 HISTORY_WINDOW = 200       # for plotting last bars
 N_MC = 1000                # number of Monte Carlo paths
 CONF_LEVEL = 0.95
+SEED = 42                  # root seed; chunk streams are spawned from it
+CHUNK_PATHS = 100_000      # paths simulated per chunk (above this, bands are streamed)
+QUANTILE_BINS = 4096       # histogram bins per step for streaming quantiles
+SKETCH_WIDTH_SIGMAS = 8.0  # analytic sketch range: +-8 sigma of the log-price at each step
+MC_WORKERS = os.cpu_count()  # processes for chunked simulation (1 = in-process)
+MODEL = "gbm"              # path generator: "gbm", "garch" or "jump"
+GARCH_SCALE = 1000.0       # 5m log returns (~6e-4) are scaled to O(1) for the GARCH fit to converge
+JUMP_THRESHOLD = 4.0       # returns beyond this many robust std devs from the median count as jumps
+PILOT_PATHS = 10_000       # paths used to size the quantile sketch range for non-GBM models
+PILOT_PAD = 0.5            # sketch range = pilot min/max widened by this fraction of their spread
 
 # === Logging ===
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, mode="w")
-    ]
-)
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
 
 # === Utilities ===
-def load_price_csv(path: str) -> pd.DataFrame:
-    """Load CSV with columns: Date,Time,Open,High,Low,Close,Volume"""
-    df = pd.read_csv(path)
-    df["datetime"] = pd.to_datetime(df["Date"] + " " + df["Time"], format="%Y.%m.%d %H:%M")
-    df = df.set_index("datetime")
-    df["Close"] = df["Close"].astype(float)
-    return df
+@timed("load")
+def load_price_csv(path: str, tail=None) -> pd.DataFrame:
+    """Load CSV with columns: Date,Time,Open,High,Low,Close,Volume (via the cached bar store, last `tail` rows)"""
+    return load_bars(path, tail=tail)
 
+@timed("preprocess")
 def prepare_log_returns(price_series: pd.Series) -> pd.Series:
     """Compute log returns"""
     return np.log(price_series).diff().dropna()
 
-def monte_carlo_gbm(last_price: float, mu: float, sigma: float, steps: int, n_paths: int):
+def gbm_log_paths(mu: float, sigma: float, steps: int, n_paths: int, rng: np.random.Generator) -> np.ndarray:
     """
-    Simulate GBM price paths
+    Log-price offsets log(S_t / S_0) of GBM paths, shape (steps, n_paths), row 0 = 0.
+    All shocks are drawn in one block and accumulated with a cumulative sum.
     """
     dt = 1  # assume 1 step = 5 min interval, units consistent with mu/sigma
-    paths = np.zeros((steps, n_paths))
-    paths[0, :] = last_price
+    log_paths = np.empty((steps, n_paths))
+    log_paths[0] = 0.0
+    if steps > 1:
+        shocks = rng.standard_normal((steps - 1, n_paths))
+        shocks *= sigma * np.sqrt(dt)
+        shocks += (mu - 0.5 * sigma**2) * dt
+        np.cumsum(shocks, axis=0, out=log_paths[1:])
+    return log_paths
+
 
+def garch_log_paths(mu: float, omega: float, alpha: float, beta: float, h_next: float, steps: int,
+                    n_paths: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Log-price offsets of GARCH(1,1) paths, shape (steps, n_paths), row 0 = 0.
+    r_t = mu + e_t, e_t = sqrt(h_t) z_t, h_{t+1} = omega + alpha e_t^2 + beta h_t, starting from h_next.
+    """
+    log_paths = np.empty((steps, n_paths))
+    log_paths[0] = 0.0
+    h = np.full(n_paths, float(h_next))
+    shocks = rng.standard_normal((steps - 1, n_paths))
     for t in range(1, steps):
-        Z = np.random.standard_normal(n_paths)
-        paths[t, :] = paths[t-1, :] * np.exp((mu - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * Z)
+        eps = shocks[t - 1]
+        eps *= np.sqrt(h)
+        log_paths[t] = log_paths[t - 1] + mu + eps
+        h = omega + alpha * eps**2 + beta * h
+    return log_paths
+
+
+def jump_log_paths(mu: float, sigma: float, lam: float, jump_mu: float, jump_sigma: float, steps: int,
+                   n_paths: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Log-price offsets of Merton jump-diffusion paths, shape (steps, n_paths), row 0 = 0.
+    Each step adds mu + sigma z plus N ~ Poisson(lam) normal jumps N(jump_mu, jump_sigma^2);
+    mu is the drift of the diffusion part (non-jump returns), as estimated by estimate_jump_params.
+    """
+    log_paths = np.empty((steps, n_paths))
+    log_paths[0] = 0.0
+    if steps > 1:
+        shape = (steps - 1, n_paths)
+        n_jumps = rng.poisson(lam, shape)
+        incr = rng.standard_normal(shape)
+        incr *= sigma
+        incr += mu + jump_mu * n_jumps + jump_sigma * np.sqrt(n_jumps) * rng.standard_normal(shape)
+        np.cumsum(incr, axis=0, out=log_paths[1:])
+    return log_paths
+
+
+def estimate_garch_params(log_ret: pd.Series, scale=GARCH_SCALE) -> dict:
+    """
+    GARCH(1,1) parameters of the demeaned log returns (fitted on returns * scale, reported in return units)
+    and the next-step conditional variance. Falls back to constant variance if the fit fails.
+    """
+    from model_arima_garch import fit_garch_on_residuals
+
+    mu = float(log_ret.mean())
+    resid = np.asarray(log_ret, dtype=float) - mu
+    try:
+        res = fit_garch_on_residuals(resid * scale, p=1, q=1)
+        omega, alpha, beta = (float(v) for v in np.asarray(res.params)[:3])
+        h_next = float(res.forecast(horizon=1, reindex=False).variance.values[-1, 0])
+        return dict(mu=mu, omega=omega / scale**2, alpha=alpha, beta=beta, h_next=h_next / scale**2)
+    except Exception:
+        logging.warning("Falling back to constant variance for GARCH paths.")
+        var = float(resid.var())
+        return dict(mu=mu, omega=var, alpha=0.0, beta=0.0, h_next=var)
+
 
+def estimate_jump_params(log_ret: pd.Series, threshold=JUMP_THRESHOLD) -> dict:
+    """
+    Merton parameters by threshold separation: returns beyond threshold robust (MAD) std devs from
+    the median are jumps; the rest give the diffusion drift and volatility.
+    """
+    r = np.asarray(log_ret, dtype=float)
+    med = np.median(r)
+    robust_sd = 1.4826 * np.median(np.abs(r - med))
+    is_jump = np.abs(r - med) > threshold * robust_sd
+    jumps, diffusion = r[is_jump], r[~is_jump]
+    return dict(
+        mu=float(diffusion.mean()),
+        sigma=float(diffusion.std()),
+        lam=float(is_jump.mean()),
+        jump_mu=float(jumps.mean()) if len(jumps) else 0.0,
+        jump_sigma=float(jumps.std()) if len(jumps) > 1 else 0.0,
+    )
+
+
+def monte_carlo_gbm(last_price: float, mu: float, sigma: float, steps: int, n_paths: int, rng=None):
+    """
+    Simulate GBM price paths, shape (steps, n_paths); row 0 is the last observed price.
+    rng: numpy Generator (default: seeded from SEED).
+    """
+    rng = np.random.default_rng(SEED) if rng is None else rng
+    paths = gbm_log_paths(mu, sigma, steps, n_paths, rng)
+    np.exp(paths, out=paths)
+    paths *= last_price
     return paths
 
+
 def compute_statistics(paths: np.ndarray, conf_level=0.95):
     """
     Compute mean, lower, upper percentiles across Monte Carlo paths
     """
     mean_path = np.mean(paths, axis=1)
-    lower_path = np.percentile(paths, 50 - conf_level*50, axis=1)
-    upper_path = np.percentile(paths, 50 + conf_level*50, axis=1)
+    lower_path, upper_path = np.percentile(paths, [50 - conf_level*50, 50 + conf_level*50], axis=1)
     return mean_path, lower_path, upper_path
 
+
+class QuantileSketch:
+    """
+    Per-step fixed-edge histograms for streaming quantiles. Counts are integers, so sketches
+    built from different chunks merge exactly (by addition) in any order.
+    Values outside [lo, hi] land in under/overflow bins and clamp to the range edges.
+    """
+
+    def __init__(self, lo: np.ndarray, hi: np.ndarray, n_bins: int = QUANTILE_BINS):
+        self.lo = np.asarray(lo, dtype=float)
+        self.hi = np.maximum(np.asarray(hi, dtype=float), self.lo + 1e-12)
+        self.n_bins = n_bins
+        self.width = (self.hi - self.lo) / n_bins
+        self.counts = np.zeros((len(self.lo), n_bins + 2), dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """Add a (steps, n) block of values."""
+        idx = np.floor((values - self.lo[:, None]) / self.width[:, None])
+        idx = np.clip(idx, -1, self.n_bins).astype(np.int64) + 1
+        idx += np.arange(len(self.lo))[:, None] * (self.n_bins + 2)
+        self.counts += np.bincount(idx.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Per-step q-quantile, linearly interpolated inside the bin that contains it."""
+        cum = np.cumsum(self.counts, axis=1)
+        total = cum[:, -1]
+        target = q * total
+        k = np.argmax(cum >= target[:, None], axis=1)
+        rows = np.arange(len(k))
+        before = np.where(k > 0, cum[rows, np.maximum(k - 1, 0)], 0)
+        inside = self.counts[rows, k]
+        frac = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0.0)
+        value = self.lo + (k - 1 + frac) * self.width
+        return np.clip(value, self.lo, self.hi)
+
+
+def gbm_sketch_range(mu: float, sigma: float, steps: int, width_sigmas=SKETCH_WIDTH_SIGMAS):
+    """Analytic per-step range of GBM log-price offsets: drift +- width_sigmas standard deviations."""
+    t = np.arange(steps)
+    center = (mu - 0.5 * sigma**2) * t
+    half = width_sigmas * sigma * np.sqrt(np.maximum(t, 1))
+    return center - half, center + half
+
+
+def pilot_sketch_range(sample_log_paths, seed=SEED, n_pilot=PILOT_PATHS, pad=PILOT_PAD):
+    """
+    Per-step sketch range from a pilot chunk: its min/max widened by pad times their spread.
+    The pilot reuses the first chunk's stream, so it only sizes the bins and adds no randomness.
+    """
+    log_paths = sample_log_paths(n_pilot, np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0]))
+    lo, hi = log_paths.min(axis=1), log_paths.max(axis=1)
+    spread = hi - lo
+    return lo - pad * spread, hi + pad * spread
+
+
+def simulate_chunk(sample_log_paths, n_paths: int, seed_seq, lo, hi):
+    """
+    Simulate one chunk from its own SeedSequence and reduce it to (sum of price ratios, sketch).
+    sample_log_paths(n_paths, rng) -> (steps, n_paths) log offsets.
+    """
+    log_paths = sample_log_paths(n_paths, np.random.default_rng(seed_seq))
+    sketch = QuantileSketch(lo, hi)
+    sketch.update(log_paths)
+    return np.exp(log_paths).sum(axis=1), sketch
+
+
+def _simulate_chunk_task(task):
+    return simulate_chunk(*task)
+
+
+@timed("forecast")
+def simulate_bands(sample_log_paths, last_price: float, steps: int, n_paths: int, lo=None, hi=None,
+                   conf_level=CONF_LEVEL, chunk_paths=CHUNK_PATHS, seed=SEED, n_workers=MC_WORKERS):
+    """
+    Mean and CI bands of simulated prices. Up to chunk_paths paths are held in memory and
+    summarised exactly; beyond that, chunks with SeedSequence-spawned streams are reduced to
+    running sums and quantile sketches, so memory does not grow with n_paths.
+    Chunks run over n_workers processes (sample_log_paths must be picklable, e.g. a partial);
+    results are merged in chunk order, so the output depends only on seed and chunk_paths.
+    Without lo/hi, the sketch range comes from a pilot chunk.
+    """
+    count("mc_paths", n_paths)
+    if n_paths <= chunk_paths:
+        log_paths = sample_log_paths(n_paths, np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0]))
+        return compute_statistics(last_price * np.exp(log_paths), conf_level=conf_level)
+
+    if lo is None or hi is None:
+        lo, hi = pilot_sketch_range(sample_log_paths, seed)
+    n_chunks = -(-n_paths // chunk_paths)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tasks = [(sample_log_paths, min(chunk_paths, n_paths - i * chunk_paths), seed_seq, lo, hi)
+             for i, seed_seq in enumerate(seeds)]
+    total = np.zeros(steps)
+    sketch = QuantileSketch(lo, hi)
+    n_workers = max(1, min(n_workers or 1, n_chunks))
+    pool = mp.Pool(n_workers) if n_workers > 1 else None
+    try:
+        results = pool.imap(_simulate_chunk_task, tasks) if pool else map(_simulate_chunk_task, tasks)
+        for chunk_sum, chunk_sketch in results:
+            total += chunk_sum
+            sketch.merge(chunk_sketch)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    lower = np.exp(sketch.quantile(0.5 - conf_level / 2))
+    upper = np.exp(sketch.quantile(0.5 + conf_level / 2))
+    return last_price * total / n_paths, last_price * lower, last_price * upper
+
+
+def simulate_gbm_bands(last_price: float, mu: float, sigma: float, steps: int, n_paths: int,
+                       conf_level=CONF_LEVEL, chunk_paths=CHUNK_PATHS, seed=SEED, n_workers=MC_WORKERS):
+    """GBM forecast bands (mean, lower, upper) for any number of paths."""
+    lo, hi = gbm_sketch_range(mu, sigma, steps)
+    return simulate_bands(partial(gbm_log_paths, mu, sigma, steps), last_price, steps, n_paths,
+                          lo, hi, conf_level, chunk_paths, seed, n_workers)
+
+
+@timed("fit")
+def model_sampler(model: str, log_ret: pd.Series, steps: int):
+    """Picklable path generator (n_paths, rng) -> log offsets for the named model, from estimated params."""
+    if model == "gbm":
+        mu, sigma = float(log_ret.mean()), float(log_ret.std())
+        logging.info("GBM params: mu=%.6g, sigma=%.6g", mu, sigma)
+        return partial(gbm_log_paths, mu, sigma, steps)
+    if model == "garch":
+        p = estimate_garch_params(log_ret)
+        logging.info("GARCH(1,1) params: mu=%.6g, omega=%.6g, alpha=%.4f, beta=%.4f, h_next=%.6g",
+                     p["mu"], p["omega"], p["alpha"], p["beta"], p["h_next"])
+        return partial(garch_log_paths, p["mu"], p["omega"], p["alpha"], p["beta"], p["h_next"], steps)
+    if model == "jump":
+        p = estimate_jump_params(log_ret)
+        logging.info("Jump-diffusion params: mu=%.6g, sigma=%.6g, lambda=%.5f, jump_mu=%.6g, jump_sigma=%.6g",
+                     p["mu"], p["sigma"], p["lam"], p["jump_mu"], p["jump_sigma"])
+        return partial(jump_log_paths, p["mu"], p["sigma"], p["lam"], p["jump_mu"], p["jump_sigma"], steps)
+    raise ValueError(f"Unknown MODEL: {model}")
+
 # === Main flow ===
-if __name__ == "__main__":
-    logging.info("Loading data from %s", DATA_PATH)
-    df = load_price_csv(DATA_PATH)
-    logging.info("Loaded %d rows", len(df))
-
-    # Subsample last N rows
-    if SUBSAMPLE_SIZE is not None and len(df) > SUBSAMPLE_SIZE:
-        df_used = df.tail(SUBSAMPLE_SIZE).copy()
-        logging.info("Using last %d rows for estimation.", SUBSAMPLE_SIZE)
-    else:
-        df_used = df.copy()
-        logging.info("Using full data (size %d) for estimation.", len(df_used))
+def main(data_path=DATA_PATH, model=MODEL, plot_path=None, show_plot=True):
+    """Estimate, simulate and save the forecast CSV; plot only if plot_path or show_plot. Returns the forecast."""
+    logging.info("Loading data from %s", data_path)
+    # Decode only the last SUBSAMPLE_SIZE rows
+    df_used = load_price_csv(data_path, tail=SUBSAMPLE_SIZE)
+    logging.info("Using last %d rows for estimation.", len(df_used))
 
     # Compute log returns
     log_ret = prepare_log_returns(df_used["Close"])
@@ -101,12 +348,14 @@ if __name__ == "__main__":
 
     last_price = df_used["Close"].iloc[-1]
 
-    # Run Monte Carlo simulation
-    logging.info("Running Monte Carlo GBM with %d paths, %d steps.", N_MC, FORECAST_STEPS)
-    paths = monte_carlo_gbm(last_price, mu, sigma, steps=FORECAST_STEPS, n_paths=N_MC)
-
-    # Compute mean and confidence intervals
-    mean_path, lower_path, upper_path = compute_statistics(paths, conf_level=CONF_LEVEL)
+    # Run Monte Carlo simulation and compute mean and confidence intervals (chunked for large N_MC)
+    logging.info("Running Monte Carlo %s with %d paths, %d steps (seed %d, %d workers).",
+                 model.upper(), N_MC, FORECAST_STEPS, SEED, MC_WORKERS)
+    if model == "gbm":
+        mean_path, lower_path, upper_path = simulate_gbm_bands(last_price, mu, sigma, FORECAST_STEPS, N_MC)
+    else:
+        sampler = model_sampler(model, log_ret, FORECAST_STEPS)
+        mean_path, lower_path, upper_path = simulate_bands(sampler, last_price, FORECAST_STEPS, N_MC)
 
     # Build datetime index for forecast
     forecast_index = pd.date_range(df_used.index[-1], periods=FORECAST_STEPS + 1, freq="5T")[1:]
@@ -119,27 +368,23 @@ if __name__ == "__main__":
     }, index=forecast_index)
 
     # Save to CSV
-    forecast_df.to_csv(FORECAST_OUT_CSV, index=True)
-    logging.info("Forecast saved to %s", FORECAST_OUT_CSV)
+    out_csv = FORECAST_OUT_CSV.format(model=model)
+    with stage("save"):
+        forecast_df.to_csv(out_csv, index=True)
+    logging.info("Forecast saved to %s", out_csv)
 
     # Plot last HISTORY_WINDOW + forecast mean + CI
-    try:
-        plot_tail = df_used["Close"].tail(HISTORY_WINDOW)
-        plt.figure(figsize=(12,6))
-        plt.plot(plot_tail.index, plot_tail.values, label=f"Historical (last {HISTORY_WINDOW})")
-        plt.plot(forecast_df.index, forecast_df["price_mean"].values, label="Forecast mean")
-        plt.fill_between(forecast_df.index,
-                         forecast_df["price_lower"].values,
-                         forecast_df["price_upper"].values,
-                         color="gray", alpha=0.3, label=f"{int(CONF_LEVEL*100)}% CI")
-        plt.xlabel("Time")
-        plt.ylabel("Price")
-        plt.title("XAUUSD 5m GBM Monte Carlo Forecast (mean + CI)")
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
-    except Exception as e:
-        logging.warning("Plotting failed: %s", e)
+    plot_forecast(df_used["Close"].tail(HISTORY_WINDOW), forecast_df.index,
+                  forecast_df["price_mean"].values, forecast_df["price_lower"].values,
+                  forecast_df["price_upper"].values, CONF_LEVEL,
+                  f"XAUUSD 5m {model.upper()} Monte Carlo Forecast (mean + CI)",
+                  out_path=plot_path, show=show_plot)
 
     logging.info("Script finished.")
+    return forecast_df
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("model_gbm_montecarlo"):
+        main()
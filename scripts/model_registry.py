@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+scripts/model_registry.py
+
+Registry of trained deep-learning forecasters, so runs forecast from a saved model instead of retraining.
+- An artifact is a directory under tmp/models/<name>/ holding the Keras model, the fitted scaler
+  and manifest.json (config, config fingerprint, training data range).
+- Artifacts are compatible when their config fingerprint matches; the newest (by last trained bar) wins.
+- fine_tune continues training on windows whose targets are bars appended since the artifact.
+- manifest.json is written last, so a crash never leaves an artifact that looks complete.
+"""
+
+import os
+import json
+import pickle
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+from instrument import timed
+
+# === Configurations ===
+REGISTRY_DIR = os.path.join("tmp", "models")
+MANIFEST_FILE = "manifest.json"
+MODEL_FILE = "model.keras"
+SCALER_FILE = "scaler.pkl"
+KEEP_ARTIFACTS = 3  # newest artifacts kept per model name and config
+
+
+def config_fingerprint(config: dict) -> str:
+    """Stable hash of a JSON-serialisable config dict."""
+    return hashlib.blake2b(json.dumps(config, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def data_range(df: pd.DataFrame, source: str) -> dict:
+    """Description of the bars a model was trained on."""
+    return {
+        "source": source,
+        "rows": int(len(df)),
+        "first_timestamp": str(df.index[0]),
+        "last_timestamp": str(df.index[-1]),
+    }
+
+
+def list_artifacts(name: str, config: dict, registry_dir=REGISTRY_DIR) -> list:
+    """Manifests of complete artifacts for name with a matching config, newest first."""
+    root = os.path.join(registry_dir, name)
+    if not os.path.isdir(root):
+        return []
+    wanted = config_fingerprint(config)
+    manifests = []
+    for entry in os.listdir(root):
+        try:
+            with open(os.path.join(root, entry, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if manifest.get("config_fingerprint") == wanted:
+            manifest["path"] = os.path.join(root, entry)
+            manifests.append(manifest)
+    manifests.sort(key=lambda m: (pd.Timestamp(m["data"]["last_timestamp"]), m["created"]), reverse=True)
+    return manifests
+
+
+def find_artifact(name: str, config: dict, registry_dir=REGISTRY_DIR):
+    """Newest compatible artifact manifest, or None."""
+    manifests = list_artifacts(name, config, registry_dir)
+    return manifests[0] if manifests else None
+
+
+@timed("save.model")
+def save_artifact(name: str, model, scaler, config: dict, data: dict, registry_dir=REGISTRY_DIR) -> str:
+    """Save model, scaler and manifest as a new artifact; prune old ones. Returns the artifact path."""
+    created = datetime.now()
+    fingerprint = config_fingerprint(config)
+    path = os.path.join(registry_dir, name, f"{created:%Y%m%dT%H%M%S%f}_{fingerprint}")
+    os.makedirs(path, exist_ok=True)
+    model.save(os.path.join(path, MODEL_FILE))
+    with open(os.path.join(path, SCALER_FILE), "wb") as f:
+        pickle.dump(scaler, f)
+    manifest = {
+        "name": name,
+        "config": config,
+        "config_fingerprint": fingerprint,
+        "data": data,
+        "created": created.isoformat(),
+    }
+    with open(os.path.join(path, MANIFEST_FILE + ".tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(path, MANIFEST_FILE + ".tmp"), os.path.join(path, MANIFEST_FILE))
+    logging.info("Saved %s artifact to %s (trained through %s)", name, path, data["last_timestamp"])
+
+    for old in list_artifacts(name, config, registry_dir)[KEEP_ARTIFACTS:]:
+        shutil.rmtree(old["path"], ignore_errors=True)
+    return path
+
+
+@timed("load.model")
+def load_artifact(manifest: dict):
+    """Load (model, scaler) of an artifact manifest."""
+    from tensorflow.keras.models import load_model
+
+    model = load_model(os.path.join(manifest["path"], MODEL_FILE))
+    with open(os.path.join(manifest["path"], SCALER_FILE), "rb") as f:
+        scaler = pickle.load(f)
+    logging.info("Loaded %s artifact from %s (trained through %s)",
+                 manifest["name"], manifest["path"], manifest["data"]["last_timestamp"])
+    return model, scaler
+
+
+def new_bar_count(index: pd.DatetimeIndex, manifest: dict) -> int:
+    """Number of bars in index after the artifact's last trained bar."""
+    return int((index > pd.Timestamp(manifest["data"]["last_timestamp"])).sum())
+
+
+@timed("fit.fine_tune")
+def fine_tune(model, scaled, lookback: int, n_new: int, epochs: int = 1, batch_size: int = 64):
+    """Continue training on the windows whose targets are the last n_new bars of the scaled series."""
+    from windowing import window_dataset
+
+    n_windows = len(scaled) - lookback
+    start = max(0, n_windows - n_new)
+    logging.info("Fine-tuning on %d new bars for %d epoch(s)", n_windows - start, epochs)
+    model.fit(window_dataset(scaled, lookback, start, n_windows, batch_size=batch_size),
+              epochs=epochs, verbose=0)
+    return model
@@ -5,6 +5,10 @@ scripts/model_transformer.py
 Transformer-based pipeline for XAUUSD 5m forecasting.
 - Uses last 300k records from dataset/xauusd_5m.csv
 - Forecasts next 50 steps with Monte Carlo Dropout to estimate confidence interval
+  (simulations batched into one compiled forward pass per step)
+- Saves the trained model and scaler to the model registry (tmp/models/); later runs load the newest
+  compatible artifact and only fine-tune on bars appended since
+- Trains in float32 on a streamed tf.data pipeline of windows (windowing.py), not an (N, LOOKBACK, 1) copy
 - Plots last 200 bars + forecast mean + CI
 - Logs to logs/model_transformer.txt
 """
@@ -17,7 +21,13 @@ import tensorflow as tf
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense, LayerNormalization, Dropout, MultiHeadAttention, Add, Flatten
 from sklearn.preprocessing import MinMaxScaler
-import matplotlib.pyplot as plt
+
+from bar_store import open_bar_store
+from plotting import plot_forecast
+from instrument import stage, timed, run_summary
+from mc_dropout import mc_dropout_paths
+from windowing import window_views, window_dataset
+from model_registry import find_artifact, load_artifact, save_artifact, data_range, new_bar_count, fine_tune
 
 # === Configurations ===
 DATA_PATH = "dataset/xauusd_5m.csv"
@@ -33,45 +43,46 @@ FORECAST_STEPS = 50
 LOOKBACK = 50
 N_MC = 50  # Monte Carlo simulations for CI
 CONF_LEVEL = 0.9
+BATCH_SIZE = 64
+EPOCHS = 10
 HISTORY_WINDOW = 200
 D_MODEL = 64
 N_HEADS = 4
 D_FF = 128
 DROPOUT_RATE = 0.2
+MODEL_NAME = "transformer"
+REUSE_MODEL = True      # load the newest compatible artifact from tmp/models/ instead of retraining
+FINE_TUNE_EPOCHS = 1    # epochs on bars appended since the artifact (0 = forecast only)
+MODEL_CONFIG = dict(model=MODEL_NAME, data=DATA_PATH, subsample=SUBSAMPLE_SIZE, lookback=LOOKBACK,
+                    d_model=D_MODEL, n_heads=N_HEADS, d_ff=D_FF, dropout=DROPOUT_RATE)
 
 # === Logging ===
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [INFO] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, mode="w")
-    ]
-)
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
 
 # === Utilities ===
+@timed("load")
 def load_data(csv_file, n_records=SUBSAMPLE_SIZE):
     logging.info("Loading CSV from %s", csv_file)
     if not os.path.exists(csv_file):
         raise FileNotFoundError(f"CSV file not found: {csv_file}")
-    df = pd.read_csv(csv_file)
-    if "Close" not in df.columns:
-        raise ValueError("CSV must contain 'Close' column")
-    series = df["Close"].values[-n_records:].reshape(-1,1)
-    df_used = df.tail(n_records).copy()
-    df_used["datetime"] = pd.to_datetime(df_used["Date"] + " " + df_used["Time"], format="%Y.%m.%d %H:%M")
-    df_used.set_index("datetime", inplace=True)
-    logging.info("Loaded %d rows, using last %d for modeling", len(df), len(series))
+    store = open_bar_store(csv_file)
+    df_used = store.tail(n_records)
+    series = df_used["Close"].values.reshape(-1,1)
+    logging.info("Loaded %d rows, using last %d for modeling", len(store), len(series))
     return series, df_used
 
+@timed("preprocess")
 def create_dataset(series, lookback=LOOKBACK):
-    X, y = [], []
-    for i in range(len(series)-lookback):
-        X.append(series[i:i+lookback,0])
-        y.append(series[i+lookback,0])
-    X = np.array(X)
-    y = np.array(y)
-    return X.reshape((X.shape[0], X.shape[1],1)), y
+    # float32 strided views over the series (no per-window copies)
+    return window_views(series, lookback)
 
 def transformer_block(x, d_model, n_heads, d_ff, dropout_rate):
     attn_output = MultiHeadAttention(num_heads=n_heads, key_dim=d_model)(x, x)
@@ -94,18 +105,10 @@ def build_transformer_model(lookback):
     model.compile(optimizer='adam', loss='mse')
     return model
 
-def forecast_with_uncertainty(model, last_window, n_steps, scaler, n_sim=N_MC):
-    forecasts = []
-    for sim in range(n_sim):
-        preds = []
-        window = last_window.copy()
-        for _ in range(n_steps):
-            pred = model(window, training=True).numpy()[0,0]
-            preds.append(pred)
-            window = np.roll(window, -1, axis=1)
-            window[0,-1,0] = pred
-        forecasts.append(preds)
-    forecasts = np.array(forecasts)
+@timed("forecast")
+def forecast_with_uncertainty(model, last_window, n_steps, scaler, n_sim=N_MC, step_fn=None):
+    # MC Dropout: all simulations run as one batch per step (see mc_dropout.py)
+    forecasts = mc_dropout_paths(model, last_window, n_steps, n_sim, step_fn=step_fn)
     mean_forecast = forecasts.mean(axis=0)
     lower = np.percentile(forecasts, (1-CONF_LEVEL)/2*100, axis=0)
     upper = np.percentile(forecasts, (1+CONF_LEVEL)/2*100, axis=0)
@@ -115,27 +118,45 @@ def forecast_with_uncertainty(model, last_window, n_steps, scaler, n_sim=N_MC):
     return mean_forecast, lower, upper
 
 # === Main ===
-if __name__ == "__main__":
+def main(data_path=DATA_PATH, plot_path=None, show_plot=True):
+    """Train or load the model, forecast with MC Dropout; plot only if plot_path or show_plot. Returns the forecast."""
     try:
-        series, df_used = load_data(DATA_PATH)
+        series, df_used = load_data(data_path)
     except Exception as e:
         logging.error("Error loading data: %s", e)
         exit(1)
 
-    scaler = MinMaxScaler()
-    scaled = scaler.fit_transform(series)
+    # Reuse the newest compatible trained model if there is one
+    config = dict(MODEL_CONFIG, data=data_path)
+    artifact = find_artifact(MODEL_NAME, config) if REUSE_MODEL else None
+    if artifact is not None:
+        model, scaler = load_artifact(artifact)
+        scaled = scaler.transform(series).astype(np.float32)
+    else:
+        scaler = MinMaxScaler()
+        scaled = scaler.fit_transform(series).astype(np.float32)
 
     X, y = create_dataset(scaled)
-    split = int(len(X)*0.8)
-    X_train, y_train = X[:split], y[:split]
-    X_val, y_val = X[split:], y[split:]
-
-    logging.info("Building Transformer model...")
-    model = build_transformer_model(LOOKBACK)
-
-    logging.info("Training Transformer model...")
-    model.fit(X_train, y_train, validation_data=(X_val, y_val),
-              epochs=10, batch_size=64, verbose=1)
+    if artifact is None:
+        split = int(len(X)*0.8)
+        # Batches are gathered from the scaled series on the fly and prefetched
+        train_ds = window_dataset(scaled, LOOKBACK, 0, split, batch_size=BATCH_SIZE)
+        val_ds = window_dataset(scaled, LOOKBACK, split, len(X), batch_size=BATCH_SIZE, shuffle=False)
+
+        logging.info("Building Transformer model...")
+        model = build_transformer_model(LOOKBACK)
+
+        logging.info("Training Transformer model...")
+        with stage("fit"):
+            model.fit(train_ds, validation_data=val_ds, epochs=EPOCHS, verbose=1)
+        save_artifact(MODEL_NAME, model, scaler, config, data_range(df_used, data_path))
+    else:
+        n_new = new_bar_count(df_used.index, artifact)
+        if n_new and FINE_TUNE_EPOCHS:
+            fine_tune(model, scaled, LOOKBACK, n_new, epochs=FINE_TUNE_EPOCHS, batch_size=BATCH_SIZE)
+            save_artifact(MODEL_NAME, model, scaler, config, data_range(df_used, data_path))
+        else:
+            logging.info("Forecasting with saved model (%d new bars since training)", n_new)
 
     last_window = X[-1:].copy()
     logging.info("Forecasting next %d steps with Monte Carlo Dropout...", FORECAST_STEPS)
@@ -143,20 +164,18 @@ if __name__ == "__main__":
 
     forecast_index = pd.date_range(df_used.index[-1], periods=FORECAST_STEPS+1, freq="5T")[1:]
 
-    # Plot last HISTORY_WINDOW + forecast
-    plot_tail = df_used["Close"].tail(HISTORY_WINDOW)
-    plt.figure(figsize=(12,6))
-    plt.plot(plot_tail.index, plot_tail.values, label=f"Historical (last {HISTORY_WINDOW})")
-    plt.plot(forecast_index, mean_forecast, label="Forecast mean")
-    plt.fill_between(forecast_index, lower, upper, color="gray", alpha=0.3, label=f"{int(CONF_LEVEL*100)}% CI")
-    plt.xlabel("Time")
-    plt.ylabel("Price")
-    plt.title("XAUUSD 5m Transformer Forecast (mean + CI)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    # Plot last HISTORY_WINDOW bars + forecast
+    plot_forecast(df_used["Close"].tail(HISTORY_WINDOW), forecast_index, mean_forecast, lower, upper,
+                  CONF_LEVEL, "XAUUSD 5m Transformer Forecast (mean + CI)", out_path=plot_path, show=show_plot)
 
     logging.info("Forecasted prices (mean and 90%% CI):")
     for i in range(FORECAST_STEPS):
         logging.info("Step %d: %.4f [%.4f, %.4f]", i+1, mean_forecast[i], lower[i], upper[i])
+    return pd.DataFrame({"price_mean": mean_forecast, "price_lower": lower, "price_upper": upper},
+                        index=forecast_index)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("model_transformer"):
+        main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+scripts/param_sweep.py
+
+Parallel grid search over EMA_RSI_MACD parameters using the vectorized engine.
+- Parameter ranges in PARAM_GRID; invalid combos (fast >= slow) are skipped.
+- Combinations are spread over a process pool; workers memory-map the bar store
+  (dataset/cache/) instead of receiving pickled data per task.
+- Each result is appended to backtest/param_sweep.csv (newline-terminated, fsynced) as soon as it
+  completes, so an interrupted sweep resumes where it stopped; a torn last row is dropped and rerun.
+- Workers share sub-indicators through an IndicatorCache (in-memory LRU, optionally persisted
+  to dataset/cache/indicators/), so cost scales with distinct indicators, not combinations.
+- Writes a ranked table (by Sharpe) to backtest/param_sweep_ranked.csv; logs to logs/param_sweep.txt.
+"""
+
+import os
+import csv
+import logging
+import multiprocessing as mp
+from itertools import product
+
+import pandas as pd
+
+from bar_store import open_bar_store
+from indicator_cache import IndicatorCache, INDICATOR_CACHE_DIR
+from vector_backtest import STRATEGY_PARAMS, run_backtest_arrays, summary_stats
+from instrument import stage, count, run_summary
+
+# === Configurations ===
+DATA_PATH = "dataset/xauusd_5m.csv"
+BACKTEST_DIR = "backtest"
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "param_sweep.txt")
+SWEEP_OUT_CSV = os.path.join(BACKTEST_DIR, "param_sweep.csv")
+RANKED_OUT_CSV = os.path.join(BACKTEST_DIR, "param_sweep_ranked.csv")
+
+PARAM_GRID = dict(
+    ema_fast=range(5, 13),
+    ema_slow=range(10, 31, 2),
+    rsi_period=[7, 14, 21],
+    rsi_overbought=[65, 70, 75],
+    rsi_oversold=[25, 30, 35],
+    macd_fast=[12],
+    macd_slow=[26],
+    macd_signal=[9],
+)
+PARAM_NAMES = tuple(STRATEGY_PARAMS)
+METRIC_NAMES = ("sharpe", "max_drawdown", "final_value", "trades")
+RANK_BY = "sharpe"
+N_WORKERS = os.cpu_count()
+TASK_CHUNKSIZE = 16         # neighbouring combinations share indicators, so keep them on one worker
+PERSIST_INDICATORS = True   # share computed indicators between workers and runs via disk
+TOP_N = 10
+
+# per-worker state, set by _init_worker
+_store = None
+_cache = None
+
+
+def grid_combinations(grid: dict) -> list:
+    """All valid parameter tuples (ordered as PARAM_NAMES) of the grid."""
+    ranges = [list(grid.get(name, [STRATEGY_PARAMS[name]])) for name in PARAM_NAMES]
+    combos = []
+    for values in product(*ranges):
+        p = dict(zip(PARAM_NAMES, values))
+        if p["ema_fast"] < p["ema_slow"] and p["macd_fast"] < p["macd_slow"]:
+            combos.append(values)
+    return combos
+
+
+def completed_combinations(path: str) -> set:
+    """Parameter tuples already present in the results CSV (for resuming)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    done = pd.read_csv(path, usecols=list(PARAM_NAMES) + list(METRIC_NAMES)).dropna()
+    return set(map(tuple, done[list(PARAM_NAMES)].astype(int).itertuples(index=False)))
+
+
+def _drop_partial_line(path: str) -> None:
+    """
+    Truncate a last row left without its newline by an interrupted run. Rows are written newline-terminated
+    and fsynced, so only newline-terminated rows are complete, even if a truncated one still parses.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            if pos == end and chunk.endswith(b"\n"):
+                return
+            i = chunk.rfind(b"\n")
+            if i >= 0:
+                pos -= step - i - 1
+                break
+            pos -= step
+        f.truncate(pos)
+    logging.warning("Dropped incomplete last row of %s (%d bytes)", path, end - pos)
+
+
+def _init_worker(data_path: str, persist: bool = PERSIST_INDICATORS):
+    """Open the memory-mapped bar store and an indicator cache once per worker process."""
+    global _store, _cache
+    _store = open_bar_store(data_path)
+    _cache = IndicatorCache(cache_dir=INDICATOR_CACHE_DIR if persist else None)
+
+
+def evaluate(values: tuple) -> tuple:
+    """Run one backtest in a worker and return (params..., metrics...)."""
+    p = dict(zip(PARAM_NAMES, values))
+    result = run_backtest_arrays(_store["Open"], _store["Close"], p, cache=_cache,
+                                 fingerprint=_store.fingerprint)
+    stats = summary_stats(result)
+    return tuple(values) + tuple(stats[m] for m in METRIC_NAMES)
+
+
+def run_sweep(data_path=DATA_PATH, grid=PARAM_GRID, out_csv=SWEEP_OUT_CSV, n_workers=N_WORKERS,
+              chunksize=TASK_CHUNKSIZE) -> pd.DataFrame:
+    """Evaluate all pending combinations in parallel, streaming rows to out_csv. Returns the full table."""
+    store = open_bar_store(data_path)  # build the cache once, before workers map it
+    combos = grid_combinations(grid)
+    _drop_partial_line(out_csv)
+    done = completed_combinations(out_csv)
+    pending = [c for c in combos if tuple(c) not in done]
+    logging.info("Sweep over %d bars: %d combinations, %d already done, %d pending, %d workers",
+                 len(store), len(combos), len(combos) - len(pending), len(pending), n_workers)
+
+    if pending:
+        new_file = not os.path.exists(out_csv) or os.path.getsize(out_csv) == 0
+        with open(out_csv, "a", newline="") as f, mp.Pool(n_workers, initializer=_init_worker,
+                                                          initargs=(data_path,)) as pool:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(PARAM_NAMES + METRIC_NAMES)
+            for i, row in enumerate(pool.imap_unordered(evaluate, pending, chunksize=chunksize), 1):
+                writer.writerow(row)
+                f.flush()
+                os.fsync(f.fileno())
+                count("combinations")
+                if i % 100 == 0 or i == len(pending):
+                    logging.info("Completed %d/%d", i, len(pending))
+
+    return pd.read_csv(out_csv).dropna()
+
+
+def rank_results(results: pd.DataFrame, by=RANK_BY) -> pd.DataFrame:
+    """Sort results best-first by the given metric."""
+    return results.sort_values(by, ascending=False, kind="stable").reset_index(drop=True)
+
+
+# === Main ===
+if __name__ == "__main__":
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="a")
+        ]
+    )
+
+    with run_summary("param_sweep"):
+        with stage("sweep"):
+            results = run_sweep()
+        ranked = rank_results(results)
+        with stage("save"):
+            ranked.to_csv(RANKED_OUT_CSV, index=False)
+        logging.info("Ranked results saved to %s", RANKED_OUT_CSV)
+        logging.info("Top %d by %s:\n%s", TOP_N, RANK_BY, ranked.head(TOP_N).to_string(index=False))
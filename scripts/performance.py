@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+scripts/performance.py
+
+Vectorized performance analytics for backtest results (vector_backtest.py, backtest_strategy.py, sweeps).
+- Equity metrics: total return, annualized Sharpe and Sortino of per-bar returns, max drawdown and its
+  duration in bars. Each is one NumPy pass along the last axis, so a (runs x bars) equity matrix is
+  scored in one call as well as a single curve.
+- Trade metrics from closed-trade net PnL: win rate, profit factor, average win/loss, expectancy.
+- Exposure: fraction of bars with an open position.
+- Per-month and per-session (hour-of-day bucket of the bar timestamp) return breakdowns.
+"""
+
+import numpy as np
+import pandas as pd
+
+# === Configurations ===
+BARS_PER_YEAR = 252 * 23 * 12  # 5m bars in a trading year (~23h sessions)
+SESSIONS = (                   # (name, start hour, end hour) of the bar timestamp, end exclusive
+    ("asia", 0, 7),
+    ("london", 7, 13),
+    ("new_york", 13, 21),
+    ("late", 21, 24),
+)
+
+
+# === Equity curve ===
+def bar_returns(equity) -> np.ndarray:
+    """Simple per-bar returns along the last axis."""
+    equity = np.asarray(equity, dtype=np.float64)
+    return np.diff(equity, axis=-1) / equity[..., :-1]
+
+
+def sharpe_ratio(returns, bars_per_year=BARS_PER_YEAR):
+    """Annualized mean / std of per-bar returns (0 where std is 0)."""
+    mean, std = returns.mean(axis=-1), returns.std(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, mean / std * np.sqrt(bars_per_year), 0.0)
+
+
+def sortino_ratio(returns, bars_per_year=BARS_PER_YEAR):
+    """Annualized mean / downside deviation (root mean square of negative returns; 0 without losses)."""
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2, axis=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(downside > 0, returns.mean(axis=-1) / downside * np.sqrt(bars_per_year), 0.0)
+
+
+def drawdown_stats(equity):
+    """(max drawdown as a fraction of the running peak, longest time below a previous peak in bars)."""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    max_dd = ((peak - equity) / peak).max(axis=-1)
+    idx = np.arange(equity.shape[-1])
+    last_high = np.maximum.accumulate(np.where(equity >= peak, idx, 0), axis=-1)
+    return max_dd, (idx - last_high).max(axis=-1)
+
+
+def equity_metrics(equity, bars_per_year=BARS_PER_YEAR) -> dict:
+    """Return/risk metrics of one equity curve, or of each row of a (runs x bars) matrix."""
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = bar_returns(equity)
+    max_dd, dd_bars = drawdown_stats(equity)
+    metrics = {
+        "total_return": equity[..., -1] / equity[..., 0] - 1.0,
+        "sharpe": sharpe_ratio(returns, bars_per_year),
+        "sortino": sortino_ratio(returns, bars_per_year),
+        "max_drawdown": max_dd,
+        "max_drawdown_bars": dd_bars,
+    }
+    if equity.ndim == 1:
+        metrics = {k: v.item() for k, v in metrics.items()}
+    return metrics
+
+
+# === Trades and positions ===
+def trade_metrics(pnl) -> dict:
+    """Statistics of closed-trade net PnL: count, win rate, profit factor, average win/loss, expectancy."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    pnl = pnl[~np.isnan(pnl)]
+    wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+    gross_win, gross_loss = wins.sum(), -losses.sum()
+    return {
+        "closed_trades": int(len(pnl)),
+        "win_rate": len(wins) / len(pnl) if len(pnl) else 0.0,
+        "profit_factor": float(gross_win / gross_loss) if gross_loss > 0 else (np.inf if gross_win > 0 else 0.0),
+        "avg_win": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss": float(losses.mean()) if len(losses) else 0.0,
+        "expectancy": float(pnl.mean()) if len(pnl) else 0.0,
+    }
+
+
+def exposure(position) -> float:
+    """Fraction of bars holding a position."""
+    position = np.asarray(position)
+    return float(np.count_nonzero(position) / len(position)) if len(position) else 0.0
+
+
+def performance_report(equity, position=None, trade_pnl=None, bars_per_year=BARS_PER_YEAR) -> dict:
+    """All scalar metrics of one backtest; position and trade_pnl are optional."""
+    report = equity_metrics(equity, bars_per_year)
+    report["final_value"] = float(equity[-1])
+    if position is not None:
+        report["exposure"] = exposure(position)
+    if trade_pnl is not None:
+        report.update(trade_metrics(trade_pnl))
+    return report
+
+
+# === Breakdowns ===
+def monthly_returns(equity, index) -> pd.DataFrame:
+    """Return of each calendar month (last equity of the month vs last equity of the previous one)."""
+    equity = np.asarray(equity, dtype=np.float64)
+    index = pd.DatetimeIndex(index)
+    key = index.year.to_numpy() * 12 + index.month.to_numpy() - 1
+    last = np.r_[np.flatnonzero(np.diff(key)), len(key) - 1]
+    end = equity[last]
+    start = np.r_[equity[0], end[:-1]]
+    months = pd.PeriodIndex(index[last], freq="M", name="month")
+    return pd.DataFrame({"return": end / start - 1.0, "bars": np.diff(np.r_[-1, last])}, index=months)
+
+
+def session_returns(equity, index, sessions=SESSIONS) -> pd.DataFrame:
+    """Compounded return, bar count and mean per-bar return of each session bucket."""
+    returns = bar_returns(equity)
+    hours = pd.DatetimeIndex(index).hour.to_numpy()[1:]
+    code = np.full(len(hours), len(sessions))
+    for i, (_, start, end) in enumerate(sessions):
+        code[(hours >= start) & (hours < end)] = i
+    n = len(sessions)
+    bars = np.bincount(code, minlength=n + 1)[:n]
+    log_sum = np.bincount(code, weights=np.log1p(returns), minlength=n + 1)[:n]
+    ret_sum = np.bincount(code, weights=returns, minlength=n + 1)[:n]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(bars > 0, ret_sum / bars, np.nan)
+    return pd.DataFrame({"return": np.expm1(log_sum), "bars": bars, "mean_bar_return": mean},
+                        index=pd.Index([s[0] for s in sessions], name="session"))
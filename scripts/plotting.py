@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+scripts/plotting.py
+
+Forecast plot shared by the forecasting scripts.
+- matplotlib is imported on first use, so runs that do not plot never load it.
+- Figures are written to a file and/or shown; with neither requested nothing is drawn.
+"""
+
+import logging
+
+from instrument import timed
+
+
+@timed("plot")
+def plot_forecast(history, index, mean, lower, upper, conf_level: float, title: str,
+                  out_path=None, show=False) -> None:
+    """Plot historical closes plus forecast mean and CI band; save to out_path and/or show."""
+    if not out_path and not show:
+        return
+    import matplotlib.pyplot as plt
+
+    try:
+        fig = plt.figure(figsize=(12, 6))
+        plt.plot(history.index, history.values, label=f"Historical (last {len(history)})")
+        plt.plot(index, mean, label="Forecast mean")
+        plt.fill_between(index, lower, upper, color="gray", alpha=0.3, label=f"{int(conf_level*100)}% CI")
+        plt.xlabel("Time")
+        plt.ylabel("Price")
+        plt.title(title)
+        plt.legend()
+        plt.grid(True)
+        plt.tight_layout()
+        if out_path:
+            fig.savefig(out_path)
+            logging.info("Plot saved to %s", out_path)
+        if show:
+            plt.show()
+        plt.close(fig)
+    except Exception as e:
+        logging.warning("Plotting failed: %s", e)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+scripts/stream_signals.py
+
+Streaming EMA_RSI_MACD signals: bars arrive one at a time and each updates the indicator state in O(1).
+- EMA, RSI_SMA (safediv), MACD and CrossOver follow the same seeding and arithmetic as Backtrader
+  and vector_backtest.py, so BUY/SELL/CLOSE decisions match the batch backtest bar for bar.
+- Bar sources: a CSV file followed like `tail -f`, a pipe (stdin, "-"), or a local TCP socket
+  that accepts "Date,Time,Open,High,Low,Close,Volume" lines.
+- State snapshots (tmp/stream_signals_state.json) are written every SNAPSHOT_EVERY bars and on exit;
+  a restart resumes from the snapshot and skips bars it has already seen.
+- Without a snapshot, the engine warms up by replaying the bar store once.
+- Decisions are logged and appended to backtest/stream_signals.csv; logs to logs/stream_signals.txt.
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import time
+import socket
+import logging
+import argparse
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bar_store import open_bar_store, DATE_FORMAT
+from vector_backtest import STRATEGY_PARAMS, first_decision_bar
+from instrument import count, timed, run_summary
+
+# === Configurations ===
+DATA_PATH = "dataset/xauusd_5m.csv"
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "stream_signals.txt")
+TMP_DIR = "tmp"
+STATE_PATH = os.path.join(TMP_DIR, "stream_signals_state.json")
+SIGNALS_OUT_CSV = os.path.join("backtest", "stream_signals.csv")
+SNAPSHOT_EVERY = 1000      # bars between state snapshots
+POLL_SECONDS = 0.5         # file tail poll interval
+SOCKET_HOST = "127.0.0.1"
+SOCKET_PORT = 8766
+SNAPSHOT_VERSION = 1
+
+Decision = namedtuple("Decision", ["index", "timestamp", "action", "price"])
+
+
+# === Incremental indicators ===
+class StreamEma:
+    """EMA seeded with the SMA (math.fsum) of the first `period` values, then alpha*x + (1-alpha)*prev."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (1.0 + period)
+        self.alpha1 = 1.0 - self.alpha
+        self.seed = []
+        self.value = math.nan
+
+    def update(self, x: float) -> float:
+        if self.seed is not None:
+            self.seed.append(x)
+            if len(self.seed) == self.period:
+                self.value = math.fsum(self.seed) / self.period
+                self.seed = None
+            return self.value
+        self.value = self.alpha * x + self.alpha1 * self.value
+        return self.value
+
+    def state(self) -> dict:
+        return {"seed": self.seed, "value": self.value}
+
+    def load(self, state: dict) -> None:
+        self.seed, self.value = state["seed"], state["value"]
+
+
+class StreamSma:
+    """Rolling mean over the last `period` values (math.fsum of a fixed-size window)."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+
+    def update(self, x: float) -> float:
+        self.window.append(x)
+        return math.fsum(self.window) / self.period if len(self.window) == self.period else math.nan
+
+    def state(self) -> dict:
+        return {"window": list(self.window)}
+
+    def load(self, state: dict) -> None:
+        self.window = deque(state["window"], maxlen=self.period)
+
+
+class SignalEngine:
+    """
+    EMA_RSI_MACD decision logic over a bar stream. update() takes one bar and returns a Decision
+    (BUY / SELL / CLOSE on that bar, filled at the next open in the backtest) or None.
+    """
+
+    def __init__(self, params=None):
+        self.p = dict(STRATEGY_PARAMS, **(params or {}))
+        p = self.p
+        self.ema_fast = StreamEma(p["ema_fast"])
+        self.ema_slow = StreamEma(p["ema_slow"])
+        self.macd_fast = StreamEma(p["macd_fast"])
+        self.macd_slow = StreamEma(p["macd_slow"])
+        self.macd_signal = StreamEma(p["macd_signal"])
+        self.rsi_up = StreamSma(p["rsi_period"])
+        self.rsi_down = StreamSma(p["rsi_period"])
+        self.macd_start = max(p["macd_fast"], p["macd_slow"]) - 1   # first bar with a MACD line value
+        self.cross_start = max(p["ema_fast"], p["ema_slow"]) - 1    # CrossOver seeds its difference here
+        self.decide_from = first_decision_bar(p)
+        self.n = 0                  # bars seen
+        self.prev_close = math.nan
+        self.nzd = math.nan         # last non-zero fast-slow difference (CrossOver state)
+        self.position = 0           # +1 long, -1 short, 0 flat (assuming decisions fill)
+        self.last_timestamp = None
+        self.values = {}
+
+    def update(self, timestamp: int, close: float):
+        i = self.n
+        self.n += 1
+        self.last_timestamp = timestamp
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        line = self.macd_fast.update(close) - self.macd_slow.update(close)
+        signal = self.macd_signal.update(line) if i >= self.macd_start else math.nan
+
+        if i >= 1:
+            diff = close - self.prev_close
+            up = self.rsi_up.update(max(diff, 0.0))
+            down = self.rsi_down.update(max(-diff, 0.0))
+            if down == 0.0:
+                rs = 1.0 if up == 0.0 else math.inf
+            else:
+                rs = up / down
+            rsi = 100.0 - 100.0 / (1.0 + rs)
+        else:
+            rsi = math.nan
+        self.prev_close = close
+
+        cross = 0.0
+        d = fast - slow
+        if i == self.cross_start:
+            self.nzd = d
+        elif i > self.cross_start:
+            if self.nzd < 0.0 and fast > slow:
+                cross = 1.0
+            elif self.nzd > 0.0 and fast < slow:
+                cross = -1.0
+            if d != 0.0:
+                self.nzd = d
+        self.values = {"ema_fast": fast, "ema_slow": slow, "rsi": rsi, "macd": line, "signal": signal,
+                       "cross": cross}
+
+        if i < self.decide_from or cross == 0.0:
+            return None
+        p = self.p
+        action = None
+        if self.position == 0:
+            if cross > 0 and rsi < p["rsi_overbought"] and line > signal:
+                action, self.position = "BUY", 1
+            elif cross < 0 and rsi > p["rsi_oversold"] and line < signal:
+                action, self.position = "SELL", -1
+        elif (self.position > 0 and cross < 0) or (self.position < 0 and cross > 0):
+            action, self.position = "CLOSE", 0
+        return Decision(i, timestamp, action, close) if action else None
+
+    # === Snapshots ===
+    def snapshot(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "params": self.p,
+            "n": self.n,
+            "prev_close": self.prev_close,
+            "nzd": self.nzd,
+            "position": self.position,
+            "last_timestamp": self.last_timestamp,
+            "ema": {name: getattr(self, name).state()
+                    for name in ("ema_fast", "ema_slow", "macd_fast", "macd_slow", "macd_signal")},
+            "sma": {name: getattr(self, name).state() for name in ("rsi_up", "rsi_down")},
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap: dict) -> "SignalEngine":
+        engine = cls(snap["params"])
+        engine.n = snap["n"]
+        engine.prev_close = snap["prev_close"]
+        engine.nzd = snap["nzd"]
+        engine.position = snap["position"]
+        engine.last_timestamp = snap["last_timestamp"]
+        for name, state in snap["ema"].items():
+            getattr(engine, name).load(state)
+        for name, state in snap["sma"].items():
+            getattr(engine, name).load(state)
+        return engine
+
+
+@timed("save.snapshot")
+def save_snapshot(engine: SignalEngine, path=STATE_PATH) -> None:
+    """Write the engine state atomically (NaN/inf are kept as JSON extensions)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(engine.snapshot(), f)
+    os.replace(path + ".tmp", path)
+
+
+def load_snapshot(path=STATE_PATH, params=None):
+    """Engine restored from a snapshot with matching params, or None."""
+    try:
+        with open(path) as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snap.get("version") != SNAPSHOT_VERSION or snap["params"] != dict(STRATEGY_PARAMS, **(params or {})):
+        return None
+    return SignalEngine.from_snapshot(snap)
+
+
+def replay_store(engine: SignalEngine, data_path=DATA_PATH, after=None) -> list:
+    """Feed bar store history (bars after timestamp `after`) into the engine; returns the decisions."""
+    store = open_bar_store(data_path)
+    start = 0 if after is None else int(np.searchsorted(store.timestamps, after, side="right"))
+    timestamps = store.timestamps[start:].tolist()
+    closes = np.asarray(store["Close"][start:], dtype=float).tolist()
+    decisions = []
+    for ts, close in zip(timestamps, closes):
+        decision = engine.update(ts, close)
+        if decision:
+            decisions.append(decision)
+    return decisions
+
+
+# === Bar sources ===
+def parse_bar_line(line: str):
+    """(epoch seconds, close) from a "Date,Time,Open,High,Low,Close,Volume" line; None for headers/blank lines."""
+    parts = line.strip().split(",")
+    if len(parts) < 6 or not parts[0][:1].isdigit():
+        return None
+    dt = datetime.strptime(f"{parts[0]} {parts[1]}", f"{DATE_FORMAT} %H:%M").replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()), float(parts[5])
+
+
+def follow_file(path: str, poll=POLL_SECONDS, from_start=False):
+    """Yield lines appended to a file (like tail -f); complete lines only."""
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(poll)
+                continue
+            partial += chunk
+            if partial.endswith("\n"):
+                yield partial
+                partial = ""
+
+
+def read_pipe(stream=None):
+    """Yield lines from a pipe (stdin by default)."""
+    yield from (stream or sys.stdin)
+
+
+def listen_socket(host=SOCKET_HOST, port=SOCKET_PORT):
+    """Accept one feed connection at a time on a local TCP socket and yield its lines."""
+    with socket.create_server((host, port)) as server:
+        logging.info("Waiting for bar feed on %s:%d", host, port)
+        while True:
+            conn, addr = server.accept()
+            logging.info("Bar feed connected from %s", addr)
+            with conn, conn.makefile("r") as lines:
+                yield from lines
+
+
+def run_stream(engine: SignalEngine, lines, out_csv=SIGNALS_OUT_CSV, state_path=STATE_PATH,
+               snapshot_every=SNAPSHOT_EVERY) -> None:
+    """Update the engine per bar line, log and append decisions, and snapshot periodically."""
+    os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
+    new_file = not os.path.exists(out_csv)
+    since_snapshot = 0
+    latencies = deque(maxlen=10_000)
+    with open(out_csv, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["timestamp", "bar", "action", "price"])
+        try:
+            for line in lines:
+                bar = parse_bar_line(line)
+                if bar is None or (engine.last_timestamp is not None and bar[0] <= engine.last_timestamp):
+                    continue
+                t0 = time.perf_counter()
+                decision = engine.update(*bar)
+                latencies.append(time.perf_counter() - t0)
+                count("bars")
+                if decision:
+                    count("decisions")
+                    when = datetime.fromtimestamp(decision.timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M")
+                    logging.info("%s at %s price %.2f", decision.action, when, decision.price)
+                    writer.writerow([when, decision.index, decision.action, decision.price])
+                    f.flush()
+                since_snapshot += 1
+                if since_snapshot >= snapshot_every:
+                    save_snapshot(engine, state_path)
+                    since_snapshot = 0
+        finally:
+            save_snapshot(engine, state_path)
+            if latencies:
+                lat = np.asarray(latencies) * 1e6
+                logging.info("Processed %d bars; update latency mean %.1f us, p99 %.1f us",
+                             len(lat), lat.mean(), np.percentile(lat, 99))
+
+
+def setup_logging():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stderr),
+            logging.FileHandler(LOG_FILE, mode="a")
+        ]
+    )
+
+
+# === Main ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming EMA_RSI_MACD signals")
+    parser.add_argument("source", nargs="?", default="-",
+                        help='bar CSV to follow, "-" for stdin, or "socket" to listen on a local port')
+    parser.add_argument("--data", default=DATA_PATH, help="bar store used to warm up without a snapshot")
+    parser.add_argument("--from-start", action="store_true", help="read a followed file from its beginning")
+    parser.add_argument("--port", type=int, default=SOCKET_PORT)
+    args = parser.parse_args(argv)
+
+    engine = load_snapshot()
+    if engine is not None:
+        logging.info("Resumed from snapshot at bar %d (%s)", engine.n, engine.last_timestamp)
+    else:
+        engine = SignalEngine()
+        t0 = time.perf_counter()
+        decisions = replay_store(engine, args.data)
+        logging.info("Warmed up on %d bars (%d decisions) in %.2fs", engine.n, len(decisions),
+                     time.perf_counter() - t0)
+        save_snapshot(engine)
+
+    if args.source == "-":
+        lines = read_pipe()
+    elif args.source == "socket":
+        lines = listen_socket(port=args.port)
+    else:
+        lines = follow_file(args.source, from_start=args.from_start)
+    try:
+        run_stream(engine, lines)
+    except KeyboardInterrupt:
+        logging.info("Stopped at bar %d.", engine.n)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("stream_signals"):
+        main()
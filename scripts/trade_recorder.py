@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+scripts/trade_recorder.py
+
+Buffered, typed trade/event recorder for backtests.
+- Records (timestamp, event, side, price, size, commission, pnl) into preallocated NumPy columns;
+  recording is a handful of array stores, with no string formatting or I/O.
+- Full buffers are flushed in bulk: as Parquet row groups when pyarrow is installed, otherwise as a
+  stream of .npy record arrays appended to one file. read_events() loads either into a DataFrame.
+- queue_logging() optionally mirrors events as human-readable lines through a QueueHandler, so the
+  file writes happen on a listener thread, off the backtest loop.
+"""
+
+import os
+import queue
+import logging
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional; fall back to .npy record chunks
+    pa = pq = None
+
+# === Configurations ===
+FLUSH_ROWS = 4096
+EVENTS = ("signal", "fill", "close")   # stored as int8 codes (index into EVENTS)
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "datetime64[ns]"),
+    ("event", np.int8),
+    ("side", np.int8),       # +1 buy / long, -1 sell / short, 0 n/a
+    ("price", np.float64),
+    ("size", np.float64),
+    ("commission", np.float64),
+    ("pnl", np.float64),
+])
+TRADE_LOGGER = "trades"
+
+
+class TradeRecorder:
+    """Columnar event buffer flushed in bulk to <base_path>.parquet (pyarrow) or <base_path>.npy."""
+
+    def __init__(self, base_path: str, capacity: int = FLUSH_ROWS, text_logger=None):
+        self.path = base_path + (".parquet" if pq is not None else ".npy")
+        self.capacity = capacity
+        self.text_logger = text_logger
+        self.columns = {name: np.empty(capacity, dtype=RECORD_DTYPE[name]) for name in RECORD_DTYPE.names}
+        self.n = 0
+        self.total = 0
+        self._writer = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def record(self, timestamp, event: str, side: int = 0, price=np.nan, size=0.0, commission=0.0, pnl=np.nan):
+        """Append one event; flushes when the buffer is full."""
+        i = self.n
+        cols = self.columns
+        cols["timestamp"][i] = timestamp
+        cols["event"][i] = EVENTS.index(event)
+        cols["side"][i] = side
+        cols["price"][i] = price
+        cols["size"][i] = size
+        cols["commission"][i] = commission
+        cols["pnl"][i] = pnl
+        self.n = i + 1
+        if self.text_logger is not None:
+            self.text_logger.info("%s %s at %s price %.2f size %g pnl %.2f",
+                                  event.upper(), "BUY" if side > 0 else "SELL" if side < 0 else "-",
+                                  timestamp, price, size, pnl)
+        if self.n == self.capacity:
+            self.flush()
+
+    def flush(self):
+        """Write buffered events as one block."""
+        if self.n == 0:
+            return
+        block = {name: col[:self.n] for name, col in self.columns.items()}
+        if pq is not None:
+            table = pa.table(block)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            records = np.empty(self.n, dtype=RECORD_DTYPE)
+            for name, values in block.items():
+                records[name] = values
+            with open(self.path, "ab") as f:
+                np.save(f, records)
+        self.total += self.n
+        self.n = 0
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_events(path: str) -> pd.DataFrame:
+    """Load a recorder file (.parquet or .npy chunk stream) as a DataFrame with event names."""
+    if path.endswith(".parquet"):
+        df = pq.read_table(path).to_pandas()
+    else:
+        chunks = []
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            while f.tell() < size:
+                chunks.append(np.load(f))
+        df = pd.DataFrame(np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD_DTYPE))
+    df["event"] = pd.Categorical.from_codes(df["event"], EVENTS)
+    return df
+
+
+@contextmanager
+def queue_logging(log_path: str, name: str = TRADE_LOGGER):
+    """
+    Logger `name` whose records go through a QueueHandler to a FileHandler on a listener thread.
+    Yields the logger; the listener drains the queue and stops on exit.
+    """
+    q = queue.SimpleQueue()
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = QueueHandler(q)
+    logger.addHandler(handler)
+    file_handler = logging.FileHandler(log_path, mode="w")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(q, file_handler)
+    listener.start()
+    try:
+        yield logger
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+        file_handler.close()
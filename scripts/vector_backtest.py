@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+scripts/vector_backtest.py
+
+Vectorized NumPy engine for the EMA_RSI_MACD strategy (fast alternative to Backtrader).
+- EMA, RSI_SMA, MACD and CrossOver computed as whole-array operations, seeded like Backtrader's indicators.
+- Same rules as EMA_RSI_MACD.next(): enter on a filtered cross when flat, close on the opposite cross.
+- Market orders fill at the next bar's open, 0.05% commission, stake 1 (Cerebro defaults).
+- Produces equity curve, trade list and final portfolio value; logs to backtest/vector_backtest.txt.
+- Performance metrics (Sharpe, Sortino, drawdown, trade stats, exposure) and monthly/session
+  breakdowns come from scripts/performance.py; monthly returns are saved to backtest/vector_monthly.csv.
+- scripts/backtest_strategy.py (Backtrader) stays the reference for verification and plotting.
+"""
+
+import os
+import math
+import time
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+from bar_store import load_bars
+from indicator_cache import data_fingerprint
+from performance import BARS_PER_YEAR, performance_report, monthly_returns, session_returns
+from instrument import stage, run_summary
+
+# === Configurations ===
+DATA_PATH = "dataset/xauusd_5m.csv"
+BACKTEST_DIR = "backtest"
+LOG_FILE = os.path.join(BACKTEST_DIR, "vector_backtest.txt")
+TRADES_OUT_CSV = os.path.join(BACKTEST_DIR, "vector_trades.csv")
+MONTHLY_OUT_CSV = os.path.join(BACKTEST_DIR, "vector_monthly.csv")
+
+STRATEGY_PARAMS = dict(
+    ema_fast=8,
+    ema_slow=13,
+    rsi_period=14,
+    rsi_overbought=70,
+    rsi_oversold=30,
+    macd_fast=12,
+    macd_slow=26,
+    macd_signal=9
+)
+CASH = 100000
+COMMISSION = 0.0005  # 0.05%
+STAKE = 1
+
+BacktestResult = namedtuple("BacktestResult", ["equity", "position", "trades", "final_value"])
+
+
+# === Indicators (Backtrader semantics) ===
+def sma(x: np.ndarray, period: int, first: int = 0) -> np.ndarray:
+    """Simple moving average; x[:first] is treated as not yet available (NaN output)."""
+    out = np.full(len(x), np.nan)
+    if len(x) - first >= period:
+        out[first + period - 1:] = sliding_window_view(x[first:], period).sum(axis=1) / period
+    return out
+
+
+def ema(x: np.ndarray, period: int, first: int = 0) -> np.ndarray:
+    """
+    Exponential moving average, alpha = 2 / (period + 1), seeded with the SMA of the
+    first `period` values like bt.ind.EMA. The recursion runs in C via scipy.signal.lfilter.
+    """
+    out = np.full(len(x), np.nan)
+    seed_idx = first + period - 1
+    if seed_idx >= len(x):
+        return out
+    alpha = 2.0 / (1.0 + period)
+    seed = math.fsum(x[first:seed_idx + 1]) / period
+    out[seed_idx] = seed
+    if seed_idx + 1 < len(x):
+        out[seed_idx + 1:], _ = lfilter([alpha], [1.0, alpha - 1.0], x[seed_idx + 1:], zi=[(1.0 - alpha) * seed])
+    return out
+
+
+def rsi_sma(close: np.ndarray, period: int) -> np.ndarray:
+    """bt.ind.RSI_SMA with safediv=True: RSI is 100 if only up moves, 50 if flat."""
+    diff = np.r_[np.nan, np.diff(close)]
+    maup = sma(np.maximum(diff, 0.0), period, first=1)
+    madown = sma(np.maximum(-diff, 0.0), period, first=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = maup / madown
+    rs = np.where(madown == 0.0, np.where(maup == 0.0, 1.0, np.inf), rs)
+    return 100.0 - 100.0 / (1.0 + rs)
+
+
+def crossover(a: np.ndarray, b: np.ndarray, first: int) -> np.ndarray:
+    """
+    bt.ind.CrossOver(a, b): +1 on an up cross, -1 on a down cross, 0 otherwise.
+    The previous difference is the last non-zero one (NonZeroDifference), seeded at `first`.
+    """
+    n = len(a)
+    cross = np.zeros(n)
+    if first + 1 >= n:
+        return cross
+    d = a - b
+    idx = np.arange(n)
+    keep = (d != 0.0) | (idx == first)
+    keep[:first] = False
+    last = np.maximum.accumulate(np.where(keep, idx, 0))
+    nzd_prev = d[last][first:-1]
+    cross[first + 1:] = (((nzd_prev < 0.0) & (a[first + 1:] > b[first + 1:])).astype(float)
+                         - ((nzd_prev > 0.0) & (a[first + 1:] < b[first + 1:])))
+    return cross
+
+
+def compute_indicators(close: np.ndarray, p: dict, cache=None, fingerprint=None) -> dict:
+    """
+    All EMA_RSI_MACD indicator lines for parameter dict p.
+    With an IndicatorCache, each sub-indicator is computed once per (params, dataset) and reused
+    across parameter combinations; fingerprint identifies the dataset (content hash if omitted).
+    """
+    if cache is None:
+        def get(name, params, compute):
+            return compute()
+    else:
+        fingerprint = fingerprint or data_fingerprint(close)
+
+        def get(name, params, compute):
+            return cache.get(name, params, fingerprint, compute)
+
+    def close_ema(period):
+        return get("ema", (period,), lambda: ema(close, period))
+
+    fast, slow = p["macd_fast"], p["macd_slow"]
+    ema_fast = close_ema(p["ema_fast"])
+    ema_slow = close_ema(p["ema_slow"])
+    macd_line = get("macd", (fast, slow), lambda: close_ema(fast) - close_ema(slow))
+    return {
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "rsi": get("rsi_sma", (p["rsi_period"],), lambda: rsi_sma(close, p["rsi_period"])),
+        "macd": macd_line,
+        "signal": get("macd_signal", (fast, slow, p["macd_signal"]),
+                      lambda: ema(macd_line, p["macd_signal"], first=max(fast, slow) - 1)),
+        "cross": get("crossover", (p["ema_fast"], p["ema_slow"]),
+                     lambda: crossover(ema_fast, ema_slow, max(p["ema_fast"], p["ema_slow"]) - 1)),
+    }
+
+
+def first_decision_bar(p: dict) -> int:
+    """Index of the first bar on which EMA_RSI_MACD.next() can act (strategy minperiod and len() guard)."""
+    minperiod = max(p["ema_fast"], p["ema_slow"],
+                    p["rsi_period"] + 1,
+                    max(p["macd_fast"], p["macd_slow"]) + p["macd_signal"] - 1,
+                    max(p["ema_fast"], p["ema_slow"]) + 1)
+    guard = max(p["ema_slow"], p["rsi_period"], p["macd_slow"])
+    return max(minperiod, guard) - 1
+
+
+# === Signals and fills ===
+def entry_exit_events(ind: dict, p: dict, start: int):
+    """
+    Derive orders from cross events. Crosses alternate in sign, so a position opened at one
+    cross is always closed by the next one, and an entry is possible only if the previous
+    cross did not open a position. Within a run of consecutive filtered crosses, entries
+    therefore land on every other event.
+    Returns (event bar indices, side of each event, open flags, close flags).
+    """
+    cross = ind["cross"]
+    events = np.flatnonzero(cross[start:] != 0.0) + start
+    side = cross[events]
+    with np.errstate(invalid="ignore"):
+        long_ok = (ind["rsi"][events] < p["rsi_overbought"]) & (ind["macd"][events] > ind["signal"][events])
+        short_ok = (ind["rsi"][events] > p["rsi_oversold"]) & (ind["macd"][events] < ind["signal"][events])
+    filt = np.where(side > 0, long_ok, short_ok)
+    k = np.arange(len(events))
+    last_false = np.maximum.accumulate(np.where(~filt, k, -1)) if len(events) else k
+    opens = filt & ((k - last_false - 1) % 2 == 0)
+    closes = np.r_[False, opens[:-1]]
+    return events, side, opens, closes
+
+
+def run_backtest(df: pd.DataFrame, params=None, cash=CASH, commission=COMMISSION, stake=STAKE,
+                 cache=None, fingerprint=None) -> BacktestResult:
+    """
+    Backtest EMA_RSI_MACD on an OHLCV DataFrame (datetime index, Open/Close columns).
+    Orders decided on bar i fill at Open[i+1]; orders on the last bar never fill.
+    Indicators are served from `cache` (an IndicatorCache) when given.
+    """
+    return run_backtest_arrays(df["Open"].to_numpy(dtype=np.float64), df["Close"].to_numpy(dtype=np.float64),
+                               params, cash, commission, stake, cache, fingerprint, index=df.index)
+
+
+def run_backtest_arrays(open_: np.ndarray, close: np.ndarray, params=None, cash=CASH, commission=COMMISSION,
+                        stake=STAKE, cache=None, fingerprint=None, index=None) -> BacktestResult:
+    """
+    Same as run_backtest on bare Open/Close arrays (e.g. memory-mapped bar store columns).
+    Without an index, the trade table carries bar indices only.
+    """
+    p = dict(STRATEGY_PARAMS, **(params or {}))
+    close = np.asarray(close, dtype=np.float64)
+    open_ = np.asarray(open_, dtype=np.float64)
+    n = len(close)
+    ind = compute_indicators(close, p, cache, fingerprint)
+
+    events, side, opens, closes = entry_exit_events(ind, p, first_decision_bar(p))
+    fill = events + 1
+    filled = fill < n
+    # fill size per event: +stake for buy-side fills, -stake for sell-side fills
+    delta = np.where(opens, side, 0.0) + np.where(closes, side, 0.0)
+    delta = delta * stake
+    act = filled & (delta != 0.0)
+    fill_bar, fill_delta = fill[act], delta[act]
+    fill_price = open_[fill_bar]
+    fill_comm = np.abs(fill_delta) * fill_price * commission
+
+    pos_change = np.zeros(n)
+    cash_change = np.zeros(n)
+    np.add.at(pos_change, fill_bar, fill_delta)
+    np.add.at(cash_change, fill_bar, -fill_delta * fill_price - fill_comm)
+    position = np.cumsum(pos_change)
+    equity = cash + np.cumsum(cash_change) + position * close
+
+    trades = _trade_table(index, events, side, opens, filled, open_, stake, commission)
+    return BacktestResult(equity=equity, position=position, trades=trades, final_value=float(equity[-1]))
+
+
+def _trade_table(index, events, side, opens, filled, open_, stake, commission) -> pd.DataFrame:
+    """One row per filled entry; the exit is the next cross event (NaN if still open at the end)."""
+    k_in = np.flatnonzero(opens & filled)
+    k_out = k_in + 1
+    has_exit = k_out < len(events)
+    has_exit[has_exit] = filled[k_out[has_exit]]
+    entry_bar = events[k_in] + 1
+    exit_bar = np.where(has_exit, events[np.minimum(k_out, len(events) - 1)] + 1, -1)
+    entry_price = open_[entry_bar]
+    exit_price = np.where(has_exit, open_[np.maximum(exit_bar, 0)], np.nan)
+    trade_side = side[k_in]
+    pnl = (exit_price - entry_price) * trade_side * stake
+    comm = stake * commission * (entry_price + np.where(has_exit, exit_price, 0.0))
+    times = {}
+    if index is not None:
+        times = {"entry_time": index[entry_bar],
+                 "exit_time": pd.DatetimeIndex(index[np.maximum(exit_bar, 0)]).where(has_exit)}
+    return pd.DataFrame({
+        "entry_index": entry_bar,
+        "exit_index": exit_bar,
+        **times,
+        "side": trade_side.astype(int),
+        "size": stake,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "commission": comm,
+        "pnl": pnl,
+        "pnl_net": pnl - comm,
+    })
+
+
+# === Summary ===
+def summary_stats(result: BacktestResult, bars_per_year=BARS_PER_YEAR) -> dict:
+    """
+    performance.performance_report of a result: Sharpe, Sortino, drawdown, exposure and closed-trade stats,
+    plus final value and trade count (open trades included).
+    """
+    stats = performance_report(result.equity, result.position, result.trades["pnl_net"].to_numpy(), bars_per_year)
+    stats["trades"] = int(len(result.trades))
+    return stats
+
+
+# === Main ===
+def setup_logging():
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [INFO] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
+
+
+def main(data_path=DATA_PATH):
+    """Run the strategy over all bars and save the trade table. Returns the BacktestResult."""
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    with stage("load"):
+        df = load_bars(data_path)
+    logging.info("Starting vectorized backtest on %d bars...", len(df))
+    t0 = time.perf_counter()
+    with stage("backtest"):
+        result = run_backtest(df)
+    logging.info("Backtest completed in %.2fs. Final Portfolio Value: %.2f", time.perf_counter() - t0, result.final_value)
+    logging.info("Trades: %d (closed %d)", len(result.trades), int(result.trades["exit_index"].ge(0).sum()))
+    with stage("save"):
+        result.trades.to_csv(TRADES_OUT_CSV, index=False)
+    logging.info("Trades saved to %s", TRADES_OUT_CSV)
+    with stage("report"):
+        stats = summary_stats(result)
+    logging.info("Performance: %s", ", ".join(f"{k}={v:.4g}" for k, v in stats.items()))
+    logging.info("Sessions:\n%s", session_returns(result.equity, df.index).to_string())
+    with stage("save"):
+        monthly_returns(result.equity, df.index).to_csv(MONTHLY_OUT_CSV)
+    logging.info("Monthly returns saved to %s", MONTHLY_OUT_CSV)
+    return result
+
+
+if __name__ == "__main__":
+    setup_logging()
+    with run_summary("vector_backtest"):
+        main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+scripts/walkforward_arima_garch.py
+
+Rolling walk-forward evaluation of the ARIMA+GARCH forecaster (model_arima_garch.py).
+- Slides a forecast origin across history and forecasts FORECAST_STEPS bars from each one.
+- Origins are processed in blocks of REFIT_EVERY: ARIMA and GARCH are fitted once per block on the
+  TRAIN_SIZE returns before it, then a single filter pass with fixed parameters yields the state at every
+  origin in the block; h-step means and variances are computed for all origins at once.
+- Blocks run in parallel over a process pool that memory-maps the bar store.
+- Scores MAE/RMSE and CI coverage per horizon on the same price bands forecast_arima_garch publishes.
+- Writes per-origin forecasts to tmp/walkforward_arima_garch.npz and the per-horizon summary to
+  tmp/walkforward_arima_garch_summary.csv; logs to logs/walkforward_arima_garch.txt.
+"""
+
+import os
+import logging
+import multiprocessing as mp
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from statsmodels.tsa.arima.model import ARIMA
+from arch import arch_model
+
+from bar_store import open_bar_store
+from instrument import stage, run_summary
+from model_arima_garch import (
+    DATA_PATH, FORECAST_STEPS, CONF_LEVEL, GARCH_P, GARCH_Q, STATE_PATH,
+    load_model_state, state_key, reconstruct_prices,
+)
+
+warnings.filterwarnings("ignore")
+
+# === Configurations ===
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "walkforward_arima_garch.txt")
+TMP_DIR = "tmp"
+WF_OUT_NPZ = os.path.join(TMP_DIR, "walkforward_arima_garch.npz")
+WF_SUMMARY_CSV = os.path.join(TMP_DIR, "walkforward_arima_garch_summary.csv")
+
+N_ORIGINS = 5_000          # number of forecast origins, ending at the last bar with a full horizon
+ORIGIN_STEP = 1            # bars between neighbouring origins
+TRAIN_SIZE = 20_000        # returns used to fit each block's parameters
+REFIT_EVERY = 500          # origins per block (one ARIMA + GARCH fit per block)
+DEFAULT_ORDER = (1, 0, 1)  # used when no saved model state exists
+WF_WORKERS = os.cpu_count()
+
+# per-worker state, set by _init_worker
+_close = None
+
+
+def _init_worker(data_path: str):
+    """Memory-map the bar store once per worker."""
+    global _close
+    _close = open_bar_store(data_path)["Close"]
+
+
+def arima_state_forecasts(filter_results, positions: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    h-step mean forecasts from several origins of one filtered ARIMA, via its state space form:
+    a(t+1|t) is the predicted state after observing position t, then y(t+h) = d + Z a, a <- T a + c.
+    Assumes time-invariant matrices (constant trend). Returns (len(positions), horizon).
+    """
+    Z = filter_results.design[:, :, 0]
+    T = filter_results.transition[:, :, 0]
+    d = filter_results.obs_intercept[:, -1]
+    c = filter_results.state_intercept[:, -1]
+    states = filter_results.predicted_state[:, positions + 1]
+    out = np.empty((len(positions), horizon))
+    for h in range(horizon):
+        out[:, h] = (d[:, None] + Z @ states)[0]
+        states = T @ states + c[:, None]
+    return out
+
+
+def evaluate_block(task):
+    """
+    Forecast from every origin of one block.
+    task = (origins, order, horizon): origins index the return series r[i] = log(C[i+1] / C[i]).
+    Returns (origins, mean_returns, variances) or None if the block's fit failed.
+    """
+    origins, order, horizon = task
+    seg_start = origins[0] - TRAIN_SIZE + 1
+    log_close = np.log(np.asarray(_close[seg_start:origins[-1] + 2], dtype=float))
+    returns = np.diff(log_close)          # returns[j] = r[seg_start + j]
+    train = returns[:TRAIN_SIZE]
+    positions = origins - seg_start
+    try:
+        arima_params = ARIMA(train, order=order).fit(method_kwargs={"warn_convergence": False}).params
+        arima_res = ARIMA(returns, order=order).filter(arima_params)
+        resid = np.asarray(arima_res.resid)
+        garch = arch_model(resid[:TRAIN_SIZE], vol="GARCH", p=GARCH_P, q=GARCH_Q, dist="normal", mean="Zero")
+        garch_params = garch.fit(disp="off", show_warning=False).params
+        garch_all = arch_model(resid, vol="GARCH", p=GARCH_P, q=GARCH_Q, dist="normal", mean="Zero").fix(garch_params)
+        variances = garch_all.forecast(horizon=horizon, start=int(positions[0]), reindex=False).variance.values
+    except Exception as e:
+        logging.warning("Block starting at origin %d failed: %s", origins[0], e)
+        return None
+    variances = variances[positions - positions[0]]
+    means = arima_state_forecasts(arima_res.filter_results, positions, horizon)
+    return origins, means, variances
+
+
+def plan_blocks(n_bars: int, horizon=FORECAST_STEPS, n_origins=N_ORIGINS, step=ORIGIN_STEP,
+                block=REFIT_EVERY) -> list:
+    """Origin index arrays per block, latest origin leaving a full horizon of actual prices."""
+    last = n_bars - 2 - horizon
+    origins = np.arange(last, last - n_origins * step, -step)[::-1]
+    origins = origins[origins >= TRAIN_SIZE - 1]
+    return [origins[i:i + block] for i in range(0, len(origins), block)]
+
+
+def run_walkforward(data_path=DATA_PATH, order=None, horizon=FORECAST_STEPS, n_workers=WF_WORKERS) -> dict:
+    """Run all blocks (in parallel) and return per-origin forecast and actual price arrays."""
+    store = open_bar_store(data_path)
+    if order is None:
+        state = load_model_state(STATE_PATH, state_key(data_path))
+        order = tuple(state["order"]) if state else DEFAULT_ORDER
+    blocks = plan_blocks(len(store), horizon)
+    logging.info("Walk-forward ARIMA%s: %d origins in %d blocks, horizon %d, %d workers",
+                 order, sum(len(b) for b in blocks), len(blocks), horizon, n_workers)
+
+    tasks = [(b, order, horizon) for b in blocks]
+    if n_workers > 1:
+        with mp.Pool(n_workers, initializer=_init_worker, initargs=(data_path,)) as pool:
+            results = pool.map(evaluate_block, tasks)
+    else:
+        _init_worker(data_path)
+        results = list(map(evaluate_block, tasks))
+    results = [r for r in results if r is not None]
+    if not results:
+        raise RuntimeError("Walk-forward evaluation failed for all blocks.")
+
+    origins = np.concatenate([r[0] for r in results])
+    mean_returns = np.concatenate([r[1] for r in results])
+    variances = np.concatenate([r[2] for r in results])
+    close = store["Close"]
+    last_price = np.asarray(close[origins + 1], dtype=float)
+    actual = np.asarray(close, dtype=float)[origins[:, None] + 1 + np.arange(1, horizon + 1)]
+    z_value = norm.ppf(0.5 + CONF_LEVEL / 2.0)
+    price_mean, price_lower, price_upper = reconstruct_prices(last_price, mean_returns, variances, z_value)
+    return {
+        "origin_timestamp": np.asarray(store.timestamps[origins + 1]),
+        "mean_return": mean_returns.astype(np.float32),
+        "var": variances.astype(np.float32),
+        "price_mean": price_mean,
+        "price_lower": price_lower,
+        "price_upper": price_upper,
+        "actual": actual,
+    }
+
+
+def score_forecasts(wf: dict) -> pd.DataFrame:
+    """Per-horizon MAE, RMSE and CI coverage of the price forecasts."""
+    err = wf["actual"] - wf["price_mean"]
+    covered = (wf["actual"] >= wf["price_lower"]) & (wf["actual"] <= wf["price_upper"])
+    return pd.DataFrame({
+        "step": np.arange(1, err.shape[1] + 1),
+        "mae": np.abs(err).mean(axis=0),
+        "rmse": np.sqrt((err ** 2).mean(axis=0)),
+        "coverage": covered.mean(axis=0),
+        "n_origins": err.shape[0],
+    })
+
+
+# === Main ===
+if __name__ == "__main__":
+    os.makedirs(LOG_DIR, exist_ok=True)
+    os.makedirs(TMP_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(LOG_FILE, mode="w")
+        ]
+    )
+
+    with run_summary("walkforward_arima_garch"):
+        with stage("forecast"):
+            wf = run_walkforward()
+        with stage("save"):
+            np.savez_compressed(WF_OUT_NPZ, **{k: (v.astype(np.float32) if v.dtype == np.float64 else v)
+                                               for k, v in wf.items()})
+        logging.info("Per-origin forecasts saved to %s", WF_OUT_NPZ)
+
+        with stage("score"):
+            summary = score_forecasts(wf)
+        summary.to_csv(WF_SUMMARY_CSV, index=False)
+        logging.info("Summary saved to %s", WF_SUMMARY_CSV)
+        rows = sorted({i for i in (0, 4, 9, 24) if i < len(summary)} | {len(summary) - 1})
+        logging.info("Nominal CI level %.0f%%; scores at selected horizons:\n%s", CONF_LEVEL * 100,
+                     summary.iloc[rows].to_string(index=False))
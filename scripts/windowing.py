@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+scripts/windowing.py
+
+Zero-copy sliding windows for the deep-learning forecasters.
+- window_views returns (N, lookback, 1) strided views over one float32 copy of the series,
+  instead of materialising every window.
+- window_dataset streams shuffled, batched windows into model.fit via tf.data: batches are
+  gathered from the series on the fly and prefetched, so memory stays ~1x the series.
+- TensorFlow is imported only by window_dataset, so window_views works without it.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def window_views(series, lookback: int):
+    """
+    Inputs X[i] = series[i:i+lookback] and targets y[i] = series[i+lookback], as float32 views.
+    X has shape (len(series) - lookback, lookback, 1) and shares memory with the series.
+    """
+    s = np.asarray(series, dtype=np.float32).reshape(-1)
+    X = sliding_window_view(s[:-1], lookback)[..., None]
+    return X, s[lookback:]
+
+
+def window_dataset(series, lookback: int, start: int, stop: int, batch_size: int = 64,
+                   shuffle: bool = True, seed=None) -> "tf.data.Dataset":
+    """
+    tf.data pipeline of (windows, targets) batches for window indices [start, stop),
+    same indexing as window_views. The series is held once as a tensor; windows are gathered per batch.
+    """
+    import tensorflow as tf
+
+    s = tf.constant(np.asarray(series, dtype=np.float32).reshape(-1))
+    offsets = tf.range(lookback, dtype=tf.int64)
+
+    def gather(idx):
+        windows = tf.gather(s, idx[:, None] + offsets[None, :])
+        return windows[..., None], tf.gather(s, idx + lookback)
+
+    ds = tf.data.Dataset.range(start, stop)
+    if shuffle:
+        ds = ds.shuffle(stop - start, seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
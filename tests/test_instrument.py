@@ -0,0 +1,75 @@
+"""Concurrency tests for scripts/instrument.py."""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "scripts"))
+
+import instrument  # noqa: E402
+
+N_THREADS = 8
+CALLS = 200
+
+
+class _SlowDict(dict):
+    """dict whose get() yields to other threads, widening any read-modify-write race."""
+
+    def get(self, *args):
+        value = super().get(*args)
+        time.sleep(0.001)
+        return value
+
+
+@instrument.timed("worker")
+def _work():
+    instrument.count("calls")
+
+
+def _run_threads(target):
+    """Start N_THREADS threads on target at once; re-raise the first error."""
+    barrier = threading.Barrier(N_THREADS)
+    errors = []
+
+    def wrapped():
+        barrier.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapped) for _ in range(N_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+
+
+def test_timed_concurrent_entry(tmp_path):
+    with instrument.run_summary("overlap", run_dir=str(tmp_path)) as run:
+        run.active = _SlowDict()
+        run.counters = _SlowDict()
+        _run_threads(_work)
+        assert run.stages["worker"].calls == N_THREADS
+        assert run.counters["calls"] == N_THREADS
+        assert run.active == {}
+
+
+def test_timed_concurrent_calls_are_all_counted(tmp_path):
+    with instrument.run_summary("concurrency", run_dir=str(tmp_path), interval=0.001) as run:
+        _run_threads(lambda: [_work() for _ in range(CALLS)])
+        assert run.stages["worker"].calls == N_THREADS * CALLS
+        assert run.counters["calls"] == N_THREADS * CALLS
+        assert run.active == {}
+    assert list(tmp_path.glob("concurrency_*.json"))
+
+
+def test_profiled_stage_under_threads(tmp_path, monkeypatch):
+    monkeypatch.setenv(instrument.PROFILE_ENV, "worker")
+    with instrument.run_summary("profiled", run_dir=str(tmp_path)) as run:
+        _run_threads(lambda: [_work() for _ in range(CALLS)])
+        assert run.stages["worker"].calls == N_THREADS * CALLS
+        assert not run._profiling
+    assert list(tmp_path.glob("profiled_*_worker.prof"))